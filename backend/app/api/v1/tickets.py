@@ -1,17 +1,32 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from beanie import PydanticObjectId
+from beanie.operators import In
 
 from app.core.security import get_current_user
 from app.core.config import settings
+from app.core.gzip_route import GzipRoute
 from app.models.user import User
 from app.models.ticket import Ticket, Passenger, Station
 from app.services.ocr_service import OCRService, OCRExtractionError
 from app.services.pnr_service import PNRService
 
-router = APIRouter()
+# GzipRoute lets clients send large JSON bodies (e.g. POST /bulk) with Content-Encoding: gzip
+router = APIRouter(route_class=GzipRoute)
+
+# Upper bound on tickets accepted by one POST /bulk call
+MAX_BULK_TICKETS = 50
+
+# Image types accepted by POST /upload and POST /upload-raw
+ALLOWED_UPLOAD_TYPES = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
+
+# Shared across requests so PNR lookups reuse pooled API connections; closed on shutdown in main.py
+pnr_service = PNRService(
+    api_key=settings.INDIAN_RAIL_API_KEY,
+    base_url=settings.INDIAN_RAIL_API_URL
+)
 
 class PassengerCreate(BaseModel):
     name: str
@@ -49,6 +64,9 @@ class TicketResponse(BaseModel):
     status: str
     is_scattered: bool
 
+class TicketBulkCreate(BaseModel):
+    tickets: List[TicketCreate]
+
 class PNRLookupRequest(BaseModel):
     pnr: str
 
@@ -62,10 +80,6 @@ async def lookup_pnr(
     This is more accurate and faster than OCR
     """
     try:
-        pnr_service = PNRService(
-            api_key=settings.INDIAN_RAIL_API_KEY,
-            base_url=settings.INDIAN_RAIL_API_URL
-        )
         extracted_data = await pnr_service.get_ticket_details(request.pnr)
         
         return {
@@ -94,26 +108,47 @@ async def upload_ticket_image(
     Upload ticket image for OCR processing (Fallback option)
     Use /lookup-pnr endpoint instead for better accuracy
     """
+    # Read file content
+    content = await file.read()
+    return await _process_ticket_image(content, file.content_type)
+
+@router.post("/upload-raw")
+async def upload_ticket_image_raw(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload ticket image for OCR processing as the raw request body
+    Same as /upload, but without multipart framing: Content-Type is the image type
+    """
+    content_type = request.headers.get("Content-Type", "").split(";")[0].strip()
+    content = await request.body()
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Empty request body"
+        )
+    return await _process_ticket_image(content, content_type)
+
+async def _process_ticket_image(content: bytes, content_type: str) -> dict:
+    """Validate the image type and run OCR on the uploaded bytes"""
     # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
-    if file.content_type not in allowed_types:
+    if content_type not in ALLOWED_UPLOAD_TYPES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid file type. Allowed: JPEG, PNG, PDF"
         )
     
-    # Read file content
-    content = await file.read()
-    
     # Process with OCR (uses Hugging Face if available, falls back to Tesseract)
     ocr_service = OCRService(
         tesseract_cmd=settings.TESSERACT_CMD,
         huggingface_model=settings.HUGGINGFACE_MODEL,
         use_huggingface=settings.USE_HUGGINGFACE_OCR,
+        use_vllm=settings.USE_VLLM_OCR,
         use_openai_parsing=settings.USE_OPENAI_PARSING,
     )
     try:
-        extracted_data = await ocr_service.extract_ticket_data(content, file.content_type)
+        extracted_data = await ocr_service.extract_ticket_data(content, content_type)
     except OCRExtractionError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -127,24 +162,8 @@ async def upload_ticket_image(
         "method": "ocr"
     }
 
-@router.post("", response_model=TicketResponse)
-async def create_ticket(
-    ticket_data: TicketCreate,
-    current_user: User = Depends(get_current_user)
-):
-    """Create a new ticket"""
-    # Check for duplicate PNR
-    existing = await Ticket.find_one(
-        Ticket.pnr == ticket_data.pnr,
-        Ticket.user_id == current_user.id
-    )
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ticket with this PNR already exists"
-        )
-    
-    # Create passengers
+def _build_ticket(ticket_data: TicketCreate, user: User) -> Ticket:
+    """Build (but don't insert) a Ticket document from a create payload"""
     passengers = [
         Passenger(
             name=p.name,
@@ -159,9 +178,8 @@ async def create_ticket(
         for p in ticket_data.passengers
     ]
     
-    # Create ticket
-    ticket = Ticket(
-        user_id=current_user.id,
+    return Ticket(
+        user_id=user.id,
         pnr=ticket_data.pnr,
         train_number=ticket_data.train_number,
         train_name=ticket_data.train_name,
@@ -178,9 +196,9 @@ async def create_ticket(
         quota=ticket_data.quota,
         passengers=passengers,
     )
-    
-    await ticket.insert()
-    
+
+def _ticket_response(ticket: Ticket) -> TicketResponse:
+    """Serialize a Ticket for API responses"""
     return TicketResponse(
         id=str(ticket.id),
         pnr=ticket.pnr,
@@ -195,6 +213,70 @@ async def create_ticket(
         is_scattered=ticket.is_scattered(),
     )
 
+@router.post("", response_model=TicketResponse)
+async def create_ticket(
+    ticket_data: TicketCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Create a new ticket"""
+    # Check for duplicate PNR
+    existing = await Ticket.find_one(
+        Ticket.pnr == ticket_data.pnr,
+        Ticket.user_id == current_user.id
+    )
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ticket with this PNR already exists"
+        )
+    
+    ticket = _build_ticket(ticket_data, current_user)
+    await ticket.insert()
+    
+    return _ticket_response(ticket)
+
+@router.post("/bulk", response_model=List[TicketResponse])
+async def create_tickets_bulk(
+    bulk_data: TicketBulkCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create several tickets for the current user in one request
+    All PNRs are checked up front and the tickets are written with a single insert
+    """
+    if not bulk_data.tickets:
+        return []
+    if len(bulk_data.tickets) > MAX_BULK_TICKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_TICKETS} tickets per request"
+        )
+    
+    # Check for duplicate PNRs, both within the request and against existing tickets
+    pnrs = [t.pnr for t in bulk_data.tickets]
+    if len(set(pnrs)) != len(pnrs):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Duplicate PNR in request"
+        )
+    existing = await Ticket.find(
+        In(Ticket.pnr, pnrs),
+        Ticket.user_id == current_user.id
+    ).first_or_none()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ticket with PNR {existing.pnr} already exists"
+        )
+    
+    tickets = [_build_ticket(t, current_user) for t in bulk_data.tickets]
+    # insert_many doesn't write generated ids back onto the documents, so assign them first
+    for ticket in tickets:
+        ticket.id = PydanticObjectId()
+    await Ticket.insert_many(tickets)
+    
+    return [_ticket_response(ticket) for ticket in tickets]
+
 @router.get("")
 async def get_tickets(current_user: User = Depends(get_current_user)):
     """Get all tickets for current user"""
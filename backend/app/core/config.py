@@ -36,6 +36,7 @@ class Settings(BaseSettings):
     # Hugging Face OCR Model (recommended for better accuracy)
     HUGGINGFACE_MODEL: str = "nanonets/Nanonets-OCR2-3B"  # or "microsoft/trocr-base-printed"
     USE_HUGGINGFACE_OCR: bool = False  # Set to False to use Tesseract instead
+    USE_VLLM_OCR: bool = False  # Serve the HF model with vLLM (continuous batching, GPU only)
     TESSERACT_CMD: Optional[str] = None  # Optional path to tesseract executable
     
     # AI — Ticket parsing & matching (OpenAI and/or Google Gemini)
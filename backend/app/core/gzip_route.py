@@ -0,0 +1,50 @@
+"""
+Route class that accepts gzip-compressed request bodies (Content-Encoding: gzip)
+Used by routers that take large JSON payloads, e.g. bulk ticket creation
+"""
+
+import zlib
+from typing import Callable
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+
+# Cap on the decompressed body so a tiny gzip bomb can't exhaust memory
+MAX_DECOMPRESSED_BODY = 10 * 1024 * 1024
+
+
+class GzipRequest(Request):
+    """Request whose body() transparently decompresses gzip-encoded payloads"""
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                # 16 + MAX_WBITS: expect a gzip header/trailer rather than raw zlib
+                decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                try:
+                    body = decoder.decompress(body, MAX_DECOMPRESSED_BODY)
+                except zlib.error:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Invalid gzip request body"
+                    )
+                if decoder.unconsumed_tail:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Decompressed request body too large"
+                    )
+            self._body = body
+        return self._body
+
+
+class GzipRoute(APIRoute):
+    """APIRoute that hands endpoints a GzipRequest"""
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def gzip_route_handler(request: Request) -> Response:
+            return await original_route_handler(GzipRequest(request.scope, request.receive))
+
+        return gzip_route_handler
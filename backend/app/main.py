@@ -12,7 +12,7 @@ async def lifespan(app: FastAPI):
     await init_db()
     yield
     # Shutdown
-    pass
+    await tickets.pnr_service.close()
 
 app = FastAPI(
     title="Train Seat Exchange API",
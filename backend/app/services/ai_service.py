@@ -16,6 +16,10 @@ logger = logging.getLogger(__name__)
 
 ProviderName = str  # "openai" | "gemini"
 
+# Markdown code fences some models wrap around their JSON replies
+_FENCE_OPEN_RE = re.compile(r"^```(?:json)?\s*")
+_FENCE_CLOSE_RE = re.compile(r"\s*```$")
+
 
 class AIServiceError(Exception):
     pass
@@ -25,6 +29,7 @@ class AIService:
     """Call OpenAI or Gemini for JSON-formatted chat completions."""
 
     GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+    OPENAI_TIMEOUT = 30.0
 
     def __init__(self) -> None:
         self.provider_preference = (settings.AI_PROVIDER or "auto").strip().lower()
@@ -64,8 +69,8 @@ class AIService:
     def _parse_json_response(text: str) -> Dict[str, Any]:
         cleaned = text.strip()
         if cleaned.startswith("```"):
-            cleaned = re.sub(r"^```(?:json)?\s*", "", cleaned)
-            cleaned = re.sub(r"\s*```$", "", cleaned)
+            cleaned = _FENCE_OPEN_RE.sub("", cleaned)
+            cleaned = _FENCE_CLOSE_RE.sub("", cleaned)
         return json.loads(cleaned)
 
     def _get_openai_client(self):
@@ -77,7 +82,7 @@ class AIService:
             from openai import OpenAI
         except ImportError as exc:
             raise AIServiceError("openai package not installed") from exc
-        self._openai_client = OpenAI(api_key=self.openai_api_key)
+        self._openai_client = OpenAI(api_key=self.openai_api_key, timeout=self.OPENAI_TIMEOUT)
         return self._openai_client
 
     def _chat_openai(
@@ -85,8 +90,10 @@ class AIService:
         system_prompt: str,
         user_prompt: str,
         temperature: float,
+        max_tokens: Optional[int] = None,
     ) -> Dict[str, Any]:
         client = self._get_openai_client()
+        extra: Dict[str, Any] = {"max_tokens": max_tokens} if max_tokens else {}
         response = client.chat.completions.create(
             model=self.openai_model,
             messages=[
@@ -95,6 +102,7 @@ class AIService:
             ],
             temperature=temperature,
             response_format={"type": "json_object"},
+            **extra,
         )
         content = response.choices[0].message.content or ""
         return self._parse_json_response(content)
@@ -104,6 +112,7 @@ class AIService:
         system_prompt: str,
         user_prompt: str,
         temperature: float,
+        max_tokens: Optional[int] = None,
     ) -> Dict[str, Any]:
         if not self.gemini_api_key:
             raise AIServiceError("Gemini API key not configured")
@@ -120,6 +129,8 @@ class AIService:
                 "responseMimeType": "application/json",
             },
         }
+        if max_tokens:
+            payload["generationConfig"]["maxOutputTokens"] = max_tokens
 
         with httpx.Client(timeout=60.0) as client:
             response = client.post(url, json=payload)
@@ -143,14 +154,15 @@ class AIService:
         system_prompt: str,
         user_prompt: str,
         temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
     ) -> Tuple[Dict[str, Any], ProviderName]:
         errors: List[str] = []
         for provider in self._provider_order():
             try:
                 if provider == "openai":
-                    result = self._chat_openai(system_prompt, user_prompt, temperature)
+                    result = self._chat_openai(system_prompt, user_prompt, temperature, max_tokens)
                 else:
-                    result = self._chat_gemini(system_prompt, user_prompt, temperature)
+                    result = self._chat_gemini(system_prompt, user_prompt, temperature, max_tokens)
                 logger.info("AI request succeeded via %s", provider)
                 return result, provider
             except Exception as exc:
@@ -168,10 +180,12 @@ class AIService:
         system_prompt: str,
         user_prompt: str,
         temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
     ) -> Tuple[Dict[str, Any], ProviderName]:
         return await asyncio.to_thread(
             self.chat_json_sync,
             system_prompt,
             user_prompt,
             temperature,
+            max_tokens,
         )
@@ -2,6 +2,7 @@ from typing import List, Dict, Any, Optional
 import itertools
 from datetime import datetime
 from beanie import PydanticObjectId
+from beanie.operators import In
 import json
 import asyncio
 from app.core.config import settings
@@ -30,6 +31,31 @@ class MatchingService:
         """Initialize AI matching if enabled (OpenAI and/or Gemini)."""
         self.use_ai_matching = settings.ai_matching_enabled
         self.ai_service = AIService() if self.use_ai_matching else None
+        # (train_number, travel_date) -> task resolving to [(ticket, owner)] for that trip.
+        # The service is created per request, so this only dedupes lookups within a
+        # request (e.g. batch_find_matches over several tickets on the same train)
+        self._pool_cache: Dict[tuple, asyncio.Future] = {}
+    
+    async def _load_candidate_pool(self, train_number: str, travel_date: datetime) -> List[tuple]:
+        """Fetch active tickets on a trip together with their owners (one query each)"""
+        tickets = await Ticket.find(
+            Ticket.train_number == train_number,
+            Ticket.travel_date == travel_date,
+            Ticket.status == "active",
+        ).to_list()
+        owner_ids = list({t.user_id for t in tickets})
+        owners = {u.id: u for u in await User.find(In(User.id, owner_ids)).to_list()} if owner_ids else {}
+        return [(t, owners.get(t.user_id)) for t in tickets]
+    
+    async def _candidate_pool(self, train_number: str, travel_date: datetime) -> List[tuple]:
+        """Memoized _load_candidate_pool; concurrent callers share the same in-flight query"""
+        key = (train_number, travel_date)
+        pool = self._pool_cache.get(key)
+        if pool is None:
+            pool = self._pool_cache[key] = asyncio.ensure_future(
+                self._load_candidate_pool(train_number, travel_date)
+            )
+        return await pool
     
     async def find_matches(
         self,
@@ -48,19 +74,15 @@ class MatchingService:
         Returns:
             List of potential matches with scores
         """
-        # Find other tickets on the same train and date
-        other_tickets = await Ticket.find(
-            Ticket.train_number == ticket.train_number,
-            Ticket.travel_date == ticket.travel_date,
-            Ticket.user_id != ticket.user_id,
-            Ticket.status == "active",
-        ).to_list()
+        # Find other tickets on the same train and date; the pool is shared by every
+        # ticket on the trip, only the caller's own tickets are filtered out here
+        pool = await self._candidate_pool(ticket.train_number, ticket.travel_date)
+        others = [(t, u) for t, u in pool if t.user_id != ticket.user_id]
+        other_tickets = [t for t, _ in others]
         
         matches = []
         
-        for other_ticket in other_tickets:
-            # Get the other user
-            other_user = await User.get(other_ticket.user_id)
+        for other_ticket, other_user in others:
             if not other_user:
                 continue
             
@@ -94,8 +116,8 @@ class MatchingService:
             # if preferences request multi-party suggestions, compute cycles
             if preferences.get("allow_cyclic", False) and len(other_tickets) > 1:
                 # Build a small graph of relevant tickets (including original)
-                pool = [ticket] + other_tickets
-                cyclic_suggestions = self._find_small_cyclic_exchanges(pool, preferences)
+                cycle_pool = [ticket] + other_tickets
+                cyclic_suggestions = self._find_small_cyclic_exchanges(cycle_pool, preferences)
                 # Merge cyclic suggestions into matches list as special entries
                 for cyc in cyclic_suggestions:
                     matches.append({
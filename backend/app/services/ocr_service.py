@@ -1,10 +1,136 @@
+import asyncio
+import bisect
+import copy
+import hashlib
 import re
 import os
-from typing import Dict, Any, Optional, List
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Any, Optional, List, Tuple
 from io import BytesIO
-from PIL import Image
+from uuid import uuid4
+from PIL import Image, ImageOps
 
 from app.services.ai_service import AIService, AIServiceError
+from app.utils.indian_railways import DEFAULT_BERTH, GENDER_CODES, correct_station_code
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _TURBO_JPEG = TurboJPEG()  # libjpeg-turbo SIMD decoder, several times faster than PIL
+except Exception:
+    _TURBO_JPEG = None
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# Prompt for vLLM-served OCR models. Nanonets-OCR2 (the default model) is built on
+# Qwen2.5-VL, so the image placeholder follows the Qwen-VL chat template.
+VLLM_OCR_PROMPT = (
+    "<|im_start|>user\n<|vision_start|><|image_pad|><|vision_end|>"
+    "Extract all text from this Indian Railways ticket.<|im_end|>\n"
+    "<|im_start|>assistant\n"
+)
+VLLM_MAX_TOKENS = 2048
+
+# Longest-edge caps applied before OCR. Vision encoders cost O(pixels) and the HF OCR
+# models work at <=1024px anyway; Tesseract accuracy plateaus around 2000px wide.
+HF_MAX_IMAGE_EDGE = 1024
+TESSERACT_MAX_IMAGE_EDGE = 2000
+
+# LSTM engine only (--oem 1) and a single text block (--psm 6): skips the legacy
+# engine and full page-layout analysis, which dominate Tesseract time on tickets
+TESSERACT_LANG = "eng"
+TESSERACT_CONFIG = "--oem 1 --psm 6"
+
+# PDF pages rasterized per pdftoppm run: one process per batch instead of per page,
+# while the next batch still renders in the background during OCR of the current one
+PDF_PAGES_PER_BATCH = 4
+
+# Output budget for AI ticket parsing (the JSON for a full 6-passenger ticket fits easily)
+AI_PARSE_MAX_TOKENS = 1024
+
+
+class _ResultCache:
+    """Small thread-safe LRU of parsed ticket dicts (values are copied in and out)"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key_for(data: bytes, namespace: str = "") -> str:
+        return f"{namespace}:{hashlib.blake2b(data, digest_size=16).hexdigest()}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                return None
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+    
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# Parsed results of recent uploads keyed by content hash and OCR/parsing config, so UI
+# retries and re-submits of the same file skip OCR entirely (LRU, process-wide).
+# Results produced by a fallback path (mock text, HF -> Tesseract, AI -> regex) are not cached.
+OCR_RESULT_CACHE_SIZE = 512
+_OCR_RESULT_CACHE = _ResultCache(OCR_RESULT_CACHE_SIZE)
+
+# AI parse results keyed by OCR text hash and provider config, so identical text never costs a second API call
+AI_PARSE_CACHE_SIZE = 512
+_AI_PARSE_CACHE = _ResultCache(AI_PARSE_CACHE_SIZE)
+
+# Date normalization: day names to strip, month abbreviations to title-case
+_DAYS_RE = re.compile(r'\b(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b', re.IGNORECASE)
+_MONTH_MAP = {
+    'jan': 'Jan', 'feb': 'Feb', 'mar': 'Mar', 'apr': 'Apr',
+    'may': 'May', 'jun': 'Jun', 'jul': 'Jul', 'aug': 'Aug',
+    'sep': 'Sep', 'oct': 'Oct', 'nov': 'Nov', 'dec': 'Dec'
+}
+_MONTH_RE = re.compile(r'\b(' + '|'.join(_MONTH_MAP) + r')\b', re.IGNORECASE)
+
+# Station fallbacks: "From: NEW DELHI (NDLS)", "To: HOWRAH (HWH)", "ANVT TO KLD"
+_FROM_KV_RE = re.compile(r'(?:From|Boarding)\s*:?\s*([A-Z\s]+)\s*\(([A-Z]{2,5})\)', re.IGNORECASE)
+_TO_KV_RE = re.compile(r'(?:To|Destination)\s*:?\s*([A-Z\s]+)\s*\(([A-Z]{2,5})\)', re.IGNORECASE)
+_FROM_TO_RE = re.compile(r'([A-Z]{2,5})\s+(?:TO|>|FROM)\s+([A-Z]{2,5})', re.IGNORECASE)
+
+# Passenger rows: "1. Name Age Gender Status/Coach/Seat/Berth" and "Name\nGender| Age yrs".
+# Matched against uppercased text, hence no IGNORECASE.
+_PASSENGER_ROW_RE = re.compile(
+    r'(?:^\d+\.|#\s*\d+)\s+([A-Z][A-Z\s]{2,30}?)\s+(\d{1,3})\s+(MALE|FEMALE|M|F)\s+(?:CNF|WL|RAC|CAN)\s*[/-]?\s*([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)?',
+    re.MULTILINE
+)
+_PASSENGER_NAME_LINE_RE = re.compile(
+    r'^([A-Z][A-Z\s]{2,30}?)\s*(?P<gender>MALE|FEMALE|M|F)\s*\|\s*(\d{1,3})\s*YRS?',
+    re.MULTILINE
+)
+
+# Passenger field normalization (anything not listed falls back to a default)
+_VALID_BERTHS = frozenset({'LB', 'MB', 'UB', 'SL', 'SU'})
+_VALID_BOOKING_STATUSES = frozenset({'CNF', 'RAC', 'WL', 'RLWL', 'PQWL'})
+
+# Class codes, and the common spelled-out forms OCR/AI return for them
+_VALID_CLASSES = frozenset({'1A', '2A', '3A', 'SL', 'CC', 'EC', '2S'})
+_CLASS_ALIASES = {
+    'AC 3 TIER': '3A', 'AC3': '3A',
+    'AC 2 TIER': '2A', 'AC2': '2A',
+    'AC 1 TIER': '1A', 'AC1': '1A',
+}
+
+# Loaded OCR models are process-wide (keyed by model name): tickets.py builds an
+# OCRService per upload, and each must not reload gigabytes of weights. A vLLM
+# engine additionally batches every concurrent upload.
+_MODEL_LOCK = threading.Lock()
+_PIPELINE_CACHE: Dict[str, Any] = {}
+_VLLM_ENGINES: Dict[str, Any] = {}
 
 
 class OCRExtractionError(Exception):
@@ -23,14 +149,19 @@ class OCRService:
     def __init__(self, tesseract_cmd: Optional[str] = None, 
                  huggingface_model: Optional[str] = None,
                  use_huggingface: bool = True,
+                 use_vllm: bool = False,
                  use_openai_parsing: bool = False,
                  openai_api_key: Optional[str] = None,
                  openai_model: str = "gpt-4o-mini"):
+        # PNR, train-number, seat, class and passenger patterns run over text.upper()
+        # (see _parse_with_regex), so they are case-sensitive with uppercase literals.
+        # Patterns whose captured text keeps its original case still use IGNORECASE.
+        
         # PNR patterns - multiple formats
         # Format 1: "PNR: 2647755663" or "PNR:2215801342"
         # Format 2: "2647755663" (standalone 10 digits)
         self.pnr_patterns = [
-            re.compile(r'PNR\s*:?\s*(\d{10})', re.IGNORECASE),
+            re.compile(r'PNR\s*:?\s*(\d{10})'),
             re.compile(r'\b(\d{10})\b'),  # Standalone 10 digits
         ]
         
@@ -38,7 +169,7 @@ class OCRService:
         # Format 1: "12556/GORAKHDHAM EXP" or "12556 GORAKHDHAM EXP"
         # Format 2: "ANVT GKP EXP (15058)" or "15058"
         self.train_patterns = [
-            re.compile(r'(\d{4,5})\s*[/-]?\s*([A-Z\s]+(?:EXPRESS|RAJDHANI|SHATABDI|DURONTO|MAIL|EXP|GKP|ANVT)?)', re.IGNORECASE),
+            re.compile(r'(\d{4,5})\s*[/-]?\s*([A-Z\s]+(?:EXPRESS|RAJDHANI|SHATABDI|DURONTO|MAIL|EXP|GKP|ANVT)?)'),
             re.compile(r'\((\d{4,5})\)'),  # Train number in parentheses
             re.compile(r'\b(\d{4,5})\b'),  # Standalone train number
         ]
@@ -54,13 +185,13 @@ class OCRService:
         # Handle OCR errors: "dking Statu" (Booking Status), "joking Status" (Current Status)
         self.seat_patterns = [
             # Pattern for "CNF/B2/21" or "CNF/B2/21/LB" or "CNF/A2/31/LB"
-            re.compile(r'(?:CNF|WL|RAC|CAN)\s*[/-]?\s*([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)?', re.IGNORECASE),
+            re.compile(r'(?:CNF|WL|RAC|CAN)\s*[/-]?\s*([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)?'),
             # Pattern for "B2/21/LB" or "A2/31/LB" (without status prefix)
-            re.compile(r'\b([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)\b', re.IGNORECASE),
+            re.compile(r'\b([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)\b'),
             # Pattern near "Booking Status" or "Current Status" (with OCR error tolerance)
-            re.compile(r'(?:Booking|Current|dking|joking)\s+(?:Status|Statu)\s*:?\s*(?:CNF|WL|RAC)?\s*[/-]?\s*([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)?', re.IGNORECASE),
+            re.compile(r'(?:BOOKING|CURRENT|DKING|JOKING)\s+(?:STATUS|STATU)\s*:?\s*(?:CNF|WL|RAC)?\s*[/-]?\s*([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)?'),
             # Pattern for "B2/21" or "A2/31" (minimal format)
-            re.compile(r'\b([A-Z]\d{1,2})\s*[/-]\s*(\d{1,3})\b', re.IGNORECASE),
+            re.compile(r'\b([A-Z]\d{1,2})\s*[/-]\s*(\d{1,3})\b'),
         ]
         
         # Date patterns - multiple formats
@@ -88,10 +219,10 @@ class OCRService:
         
         # Class patterns
         self.class_patterns = [
-            re.compile(r'(?:Class|CLASS)\s*:?\s*(1A|2A|3A|SL|CC|EC|2S|AC\s*3\s*Tier|AC\s*2\s*Tier)', re.IGNORECASE),
-            re.compile(r'\b(1A|2A|3A|SL|CC|EC|2S)\b', re.IGNORECASE),
-            re.compile(r'AC\s*3\s*Tier\s*\(?(3A)\)?', re.IGNORECASE),
-            re.compile(r'AC\s*2\s*Tier\s*\(?(2A)\)?', re.IGNORECASE),
+            re.compile(r'CLASS\s*:?\s*(1A|2A|3A|SL|CC|EC|2S|AC\s*3\s*TIER|AC\s*2\s*TIER)'),
+            re.compile(r'\b(1A|2A|3A|SL|CC|EC|2S)\b'),
+            re.compile(r'AC\s*3\s*TIER\s*\(?(3A)\)?'),
+            re.compile(r'AC\s*2\s*TIER\s*\(?(2A)\)?'),
         ]
         
         # Passenger name patterns - multiple formats
@@ -117,6 +248,7 @@ class OCRService:
         
         self.huggingface_model = huggingface_model
         self.use_huggingface = use_huggingface
+        self.use_vllm = use_vllm
         self.use_openai_parsing = use_openai_parsing
         self.openai_api_key = openai_api_key
         self.openai_model = openai_model
@@ -125,6 +257,8 @@ class OCRService:
         self.ai_available = False
         self.ai_service: Optional[AIService] = None
         self.ocr_pipeline = None  # Will be initialized if Hugging Face is available
+        self.vllm_engine = None  # Used instead of ocr_pipeline when served through vLLM
+        self.vllm_sampling_params = None
         
         # Check OCR availability
         if self.use_huggingface and self.huggingface_model:
@@ -142,9 +276,46 @@ class OCRService:
             else:
                 providers = ", ".join(self.ai_service.available_providers())
                 print(f"✅ AI parsing ready (providers: {providers}, preference: {self.ai_service.provider_preference})")
+        
+        # Cache namespaces: results from differently configured services must never mix
+        if self.vllm_engine is not None:
+            ocr_backend = f"vllm:{self.huggingface_model}"
+        elif self.huggingface_available:
+            ocr_backend = f"hf:{self.huggingface_model}"
+        elif self.tesseract_available:
+            ocr_backend = "tesseract"
+        else:
+            ocr_backend = "mock"
+        if self.use_openai_parsing and self.ai_available:
+            self._ai_cache_namespace = (
+                f"ai:{self.ai_service.provider_preference}:"
+                f"{self.ai_service.openai_model}:{self.ai_service.gemini_model}"
+            )
+            parser = self._ai_cache_namespace
+        else:
+            self._ai_cache_namespace = "ai"
+            parser = "regex"
+        self._ocr_cache_namespace = f"{ocr_backend}|{parser}"
     
     def _check_huggingface(self) -> bool:
         """Check if Hugging Face transformers are available and model can be loaded"""
+        if self.use_vllm and self._check_vllm():
+            return True
+        
+        # One pipeline per model per process: every OCRService (one per upload) shares it
+        with _MODEL_LOCK:
+            ocr_pipeline = _PIPELINE_CACHE.get(self.huggingface_model)
+            if ocr_pipeline is None:
+                ocr_pipeline = self._load_huggingface_pipeline()
+                if ocr_pipeline is None:
+                    return False
+                _PIPELINE_CACHE[self.huggingface_model] = ocr_pipeline
+        
+        self.ocr_pipeline = ocr_pipeline
+        return True
+    
+    def _load_huggingface_pipeline(self) -> Optional[Any]:
+        """Load the Hugging Face image-to-text pipeline (GPU if available, else CPU)"""
         try:
             from transformers import pipeline
             import torch
@@ -160,36 +331,76 @@ class OCRService:
                     print("   Using GPU acceleration")
                 else:
                     print("   Using CPU (slower but works)")
+                    self._limit_torch_threads(torch)
                 
                 # Initialize pipeline with appropriate device
-                self.ocr_pipeline = pipeline(
+                ocr_pipeline = pipeline(
                     "image-to-text",
                     model=self.huggingface_model,
                     device=device
                 )
                 print("✅ Hugging Face OCR model loaded successfully")
-                return True
+                return ocr_pipeline
             except Exception as e:
                 error_msg = str(e)
                 if "out of memory" in error_msg.lower() or "cuda" in error_msg.lower():
                     print(f"⚠️  GPU memory issue or CUDA error: {e}")
                     print("   Trying CPU mode...")
                     try:
-                        self.ocr_pipeline = pipeline(
+                        self._limit_torch_threads(torch)
+                        ocr_pipeline = pipeline(
                             "image-to-text",
                             model=self.huggingface_model,
                             device=-1  # Force CPU
                         )
                         print("✅ Hugging Face OCR model loaded on CPU")
-                        return True
+                        return ocr_pipeline
                     except Exception as e2:
                         print(f"⚠️  Failed to load on CPU: {e2}")
                 else:
                     print(f"⚠️  Failed to load Hugging Face model {self.huggingface_model}: {e}")
                 print("   Falling back to Tesseract OCR")
-                return False
+                return None
         except ImportError:
             print("⚠️  transformers or torch not installed. Install with: pip install transformers torch")
+            return None
+    
+    @staticmethod
+    def _limit_torch_threads(torch) -> None:
+        """Split CPU cores between uvicorn workers so CPU inference doesn't oversubscribe"""
+        workers = int(os.getenv("WEB_CONCURRENCY", "1") or 1)
+        if workers > 1:
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    
+    def _check_vllm(self) -> bool:
+        """Start (or reuse) a vLLM engine for the Hugging Face model
+        
+        vLLM schedules requests with continuous batching, so concurrent uploads
+        share GPU batches instead of queueing behind a single pipeline call.
+        """
+        try:
+            from vllm import AsyncEngineArgs, AsyncLLMEngine, SamplingParams
+        except ImportError:
+            print("⚠️  vllm not installed. Install with: pip install vllm")
+            print("   Falling back to transformers pipeline")
+            return False
+        
+        try:
+            with _MODEL_LOCK:
+                engine = _VLLM_ENGINES.get(self.huggingface_model)
+                if engine is None:
+                    print(f"🚀 Starting vLLM engine for OCR model: {self.huggingface_model}")
+                    engine = AsyncLLMEngine.from_engine_args(
+                        AsyncEngineArgs(model=self.huggingface_model, dtype="float16", max_num_seqs=32)
+                    )
+                    _VLLM_ENGINES[self.huggingface_model] = engine
+                    print("✅ vLLM OCR engine ready")
+            self.vllm_engine = engine
+            self.vllm_sampling_params = SamplingParams(temperature=0.0, max_tokens=VLLM_MAX_TOKENS)
+            return True
+        except Exception as e:
+            print(f"⚠️  Failed to start vLLM engine for {self.huggingface_model}: {e}")
+            print("   Falling back to transformers pipeline")
             return False
     
     def _check_tesseract(self, tesseract_cmd: Optional[str] = None) -> bool:
@@ -232,39 +443,61 @@ class OCRService:
         Returns:
             Dictionary containing extracted ticket data
         """
+        cache_key = _ResultCache.key_for(file_content, f"{self._ocr_cache_namespace}|{content_type}")
+        cached = _OCR_RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        result, degraded = await self._extract_ticket_data_uncached(file_content, content_type)
+        if not degraded:
+            _OCR_RESULT_CACHE.put(cache_key, result)
+        return result
+    
+    async def _extract_ticket_data_uncached(
+        self, file_content: bytes, content_type: str
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Run OCR and parsing for a file that is not in the result cache
+        
+        Returns (result, degraded); degraded is True when a fallback path produced it
+        """
         # Convert to image if PDF
         if content_type == "application/pdf":
-            text = await self._extract_from_pdf(file_content)
+            text, ocr_degraded = await self._extract_from_pdf(file_content)
         else:
-            text = await self._extract_from_image(file_content)
+            text, ocr_degraded = await self._extract_from_image(file_content)
         
-        # Parse extracted text
-        return self._parse_ticket_text(text)
+        # Parse extracted text (regex/AI parsing is blocking, keep it off the event loop)
+        result, parse_degraded = await asyncio.to_thread(self._parse_ticket_text, text)
+        return result, ocr_degraded or parse_degraded
     
-    async def _extract_from_image(self, image_bytes: bytes) -> str:
-        """Extract text from image using OCR (tries Hugging Face first, then Tesseract)"""
-        image = Image.open(BytesIO(image_bytes))
+    async def _extract_from_image(self, image_bytes: bytes) -> Tuple[str, bool]:
+        """Extract text from image using OCR (tries Hugging Face first, then Tesseract)
+        
+        Returns (text, degraded); degraded is True if Hugging Face failed or mock text was used
+        """
+        degraded = False
+        image = self._decode_image(image_bytes)
         
         # Try Hugging Face OCR first (better accuracy)
         if self.huggingface_available:
             try:
                 text = await self._extract_with_huggingface(image)
                 if text and len(text.strip()) > 10:  # Basic validation
-                    return text
+                    return text, False
                 else:
                     print("⚠️  Hugging Face OCR returned empty/insufficient text. Falling back to Tesseract...")
             except Exception as e:
                 print(f"⚠️  Hugging Face OCR error: {e}. Falling back to Tesseract...")
+            degraded = True
         
         # Fallback to Tesseract
         if self.tesseract_available:
             try:
-                import pytesseract
-                text = pytesseract.image_to_string(image)
-                return text
+                text = await asyncio.to_thread(self._run_tesseract, image)
+                return text, degraded
             except ImportError:
                 print("⚠️  pytesseract is not installed. Using mock data.")
-                return self._get_mock_ticket_text()
+                return self._get_mock_ticket_text(), True
             except Exception as e:
                 error_msg = str(e)
                 if "tesseract is not installed" in error_msg.lower() or "not in your path" in error_msg.lower():
@@ -272,14 +505,19 @@ class OCRService:
                     print("   See README file for more information.")
                 else:
                     print(f"❌ OCR Error: {error_msg}")
-                return self._get_mock_ticket_text()
+                return self._get_mock_ticket_text(), True
         
         # Final fallback to mock data
         print("⚠️  No OCR method available. Using mock data.")
-        return self._get_mock_ticket_text()
+        return self._get_mock_ticket_text(), True
     
     async def _extract_with_huggingface(self, image: Image.Image) -> str:
         """Extract text using Hugging Face OCR model"""
+        image = self._downscale_image(image, HF_MAX_IMAGE_EDGE)
+        
+        if self.vllm_engine is not None:
+            return await self._extract_with_vllm(image)
+        
         if not self.ocr_pipeline:
             raise Exception("Hugging Face OCR pipeline not initialized")
         
@@ -288,17 +526,17 @@ class OCRService:
             if image.mode != 'RGB':
                 image = image.convert('RGB')
             
-            # Run OCR pipeline
-            results = self.ocr_pipeline(image)
+            # Run OCR pipeline in a worker thread so inference doesn't block the event loop
+            results = await asyncio.to_thread(self.ocr_pipeline, image)
             
             # Handle different response formats
             if isinstance(results, list):
                 # Some models return list of dicts with 'generated_text' key
                 if results and isinstance(results[0], dict):
-                    text = ' '.join([item.get('generated_text', '') for item in results if item.get('generated_text')])
+                    text = ' '.join(t for item in results if isinstance(item, dict) and (t := item.get('generated_text')))
                 else:
                     # Some models return list of strings
-                    text = ' '.join([str(item) for item in results if item])
+                    text = ' '.join(str(item) for item in results if item)
             elif isinstance(results, dict):
                 text = results.get('generated_text', '') or results.get('text', '')
             else:
@@ -309,13 +547,59 @@ class OCRService:
             print(f"Error in Hugging Face OCR: {e}")
             raise
     
-    async def _extract_from_pdf(self, pdf_bytes: bytes) -> str:
-        """Extract text from PDF pages via pdf2image + OCR."""
+    @staticmethod
+    def _decode_image(image_bytes: bytes) -> Image.Image:
+        """Decode upload bytes, using libjpeg-turbo for JPEGs when available"""
+        if _TURBO_JPEG is not None and image_bytes.startswith(JPEG_MAGIC):
+            try:
+                return Image.fromarray(_TURBO_JPEG.decode(image_bytes, pixel_format=TJPF_RGB))
+            except Exception as e:
+                print(f"⚠️  TurboJPEG decode failed ({e}), falling back to PIL")
+        return Image.open(BytesIO(image_bytes))
+    
+    @staticmethod
+    def _downscale_image(image: Image.Image, max_edge: int) -> Image.Image:
+        """Shrink image so its longest edge is at most max_edge (never upscales)"""
+        width, height = image.size
+        scale = max_edge / max(width, height)
+        if scale >= 1:
+            return image
+        return image.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+    
+    def _run_tesseract(self, image: Image.Image) -> str:
+        """Run Tesseract on a downscaled, high-contrast grayscale copy of the image"""
+        import pytesseract
+        
+        image = self._downscale_image(image, TESSERACT_MAX_IMAGE_EDGE)
+        image = ImageOps.autocontrast(ImageOps.grayscale(image))
+        return pytesseract.image_to_string(image, lang=TESSERACT_LANG, config=TESSERACT_CONFIG)
+    
+    async def _extract_with_vllm(self, image: Image.Image) -> str:
+        """Extract text with the vLLM engine (requests are co-batched by its scheduler)"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        request = {"prompt": VLLM_OCR_PROMPT, "multi_modal_data": {"image": image}}
+        final_output = None
+        async for output in self.vllm_engine.generate(
+            request, self.vllm_sampling_params, request_id=uuid4().hex
+        ):
+            final_output = output
+        
+        if final_output is None or not final_output.outputs:
+            return ""
+        return final_output.outputs[0].text.strip()
+    
+    async def _extract_from_pdf(self, pdf_bytes: bytes) -> Tuple[str, bool]:
+        """Extract text from PDF pages via pdf2image + OCR.
+        
+        Returns (text, degraded); degraded is True if Hugging Face failed on any page
+        """
         if not pdf_bytes:
             raise OCRExtractionError("PDF file is empty.")
 
         try:
-            from pdf2image import convert_from_bytes
+            from pdf2image import convert_from_bytes, pdfinfo_from_bytes
         except ImportError as exc:
             raise OCRExtractionError(
                 "PDF support is not installed on the server (missing pdf2image)."
@@ -327,35 +611,64 @@ class OCRService:
             )
 
         try:
-            images = convert_from_bytes(pdf_bytes, dpi=200)
+            page_count = (await asyncio.to_thread(pdfinfo_from_bytes, pdf_bytes)).get("Pages", 0)
         except Exception as exc:
-            error_msg = str(exc).lower()
-            if "poppler" in error_msg or "pdftoppm" in error_msg:
-                raise OCRExtractionError(
-                    "PDF conversion failed. Poppler must be installed (poppler-utils)."
-                ) from exc
-            raise OCRExtractionError(f"Could not read PDF: {exc}") from exc
-
-        if not images:
+            raise self._pdf_conversion_error(exc) from exc
+
+        if not page_count:
             raise OCRExtractionError("PDF has no pages or could not be rendered.")
 
+        def render_pages(first_page: int) -> List[Image.Image]:
+            return convert_from_bytes(
+                pdf_bytes, dpi=200, fmt="jpeg",
+                first_page=first_page,
+                last_page=min(first_page + PDF_PAGES_PER_BATCH - 1, page_count),
+            )
+
+        # Poppler rasterizes batch K+1 in a worker thread while batch K is being OCR'd.
+        # run_in_executor submits right away instead of waiting for the loop to schedule a task.
+        loop = asyncio.get_running_loop()
         text = ""
-        for image in images:
-            if self.huggingface_available:
-                try:
-                    page_text = await self._extract_with_huggingface(image)
-                    if page_text and len(page_text.strip()) > 10:
-                        text += page_text + "\n"
-                        continue
-                except Exception as e:
-                    print(f"⚠️  Hugging Face OCR error on PDF page: {e}")
-
-            if self.tesseract_available:
+        degraded = False
+        next_batch = loop.run_in_executor(None, render_pages, 1)
+        try:
+            for first_page in range(1, page_count + 1, PDF_PAGES_PER_BATCH):
                 try:
-                    import pytesseract
-                    text += pytesseract.image_to_string(image) + "\n"
-                except Exception as e:
-                    print(f"⚠️  Tesseract error on PDF page: {e}")
+                    images = await next_batch
+                except Exception as exc:
+                    raise self._pdf_conversion_error(exc) from exc
+
+                next_first_page = first_page + PDF_PAGES_PER_BATCH
+                next_batch = (
+                    loop.run_in_executor(None, render_pages, next_first_page)
+                    if next_first_page <= page_count else None
+                )
+
+                for image in images:
+                    if self.huggingface_available:
+                        try:
+                            page_text = await self._extract_with_huggingface(image)
+                            if page_text and len(page_text.strip()) > 10:
+                                text += page_text + "\n"
+                                continue
+                        except Exception as e:
+                            print(f"⚠️  Hugging Face OCR error on PDF page: {e}")
+                        degraded = True
+
+                    if self.tesseract_available:
+                        try:
+                            text += await asyncio.to_thread(self._run_tesseract, image) + "\n"
+                        except Exception as e:
+                            print(f"⚠️  Tesseract error on PDF page: {e}")
+        finally:
+            # On an error, don't leave a prefetched batch behind: cancel it if still pending
+            # (one already rendering finishes in its thread and is dropped), or collect its
+            # exception if it already failed
+            if next_batch is not None:
+                if not next_batch.done():
+                    next_batch.cancel()
+                elif not next_batch.cancelled():
+                    next_batch.exception()
 
         if not text.strip():
             raise OCRExtractionError(
@@ -363,24 +676,36 @@ class OCRService:
                 "Try a clearer file, or use PNR lookup instead."
             )
 
-        return text
+        return text, degraded
     
-    def _parse_ticket_text(self, text: str) -> Dict[str, Any]:
+    @staticmethod
+    def _pdf_conversion_error(exc: Exception) -> OCRExtractionError:
+        """Map a pdf2image/Poppler failure to a user-facing extraction error"""
+        error_msg = str(exc).lower()
+        if "poppler" in error_msg or "pdftoppm" in error_msg or "pdfinfo" in error_msg:
+            return OCRExtractionError(
+                "PDF conversion failed. Poppler must be installed (poppler-utils)."
+            )
+        return OCRExtractionError(f"Could not read PDF: {exc}")
+    
+    def _parse_ticket_text(self, text: str) -> Tuple[Dict[str, Any], bool]:
         """Parse ticket text and extract structured data from multiple OCR formats
         
-        Uses AI parsing (OpenAI or Gemini) if enabled, otherwise falls back to regex parsing
+        Uses AI parsing (OpenAI or Gemini) if enabled, otherwise falls back to regex parsing.
+        Returns (result, degraded); degraded is True if AI parsing was enabled but not used
         """
         if self.use_openai_parsing and self.ai_available and self.ai_service:
             try:
                 result = self._parse_with_ai(text)
                 if result and result.get("confidence", 0) > 0.5:
-                    return result
+                    return result, False
                 print("⚠️  AI parsing returned low confidence, falling back to regex...")
             except Exception as e:
                 print(f"⚠️  AI parsing failed: {e}. Falling back to regex parsing...")
+            return self._parse_with_regex(text), True
         
         # Fallback to regex parsing
-        return self._parse_with_regex(text)
+        return self._parse_with_regex(text), False
     
     def _parse_with_regex(self, text: str) -> Dict[str, Any]:
         """Parse ticket text using regex patterns (original method)"""
@@ -398,10 +723,12 @@ class OCRService:
         
         # Normalize text - remove extra whitespace and newlines for better matching
         normalized_text = ' '.join(text.split())
+        # Uppercase once for the case-sensitive patterns instead of case-folding inside the regex engine
+        text_upper = text.upper()
         
         # Extract PNR - try multiple patterns
         for pattern in self.pnr_patterns:
-            pnr_match = pattern.search(text)
+            pnr_match = pattern.search(text_upper)
             if pnr_match:
                 pnr = pnr_match.group(1) if pnr_match.groups() else pnr_match.group()
                 if len(pnr) == 10 and pnr.isdigit():
@@ -415,7 +742,7 @@ class OCRService:
         
         # Try to find train number first
         for pattern in self.train_patterns:
-            train_match = pattern.search(text)
+            train_match = pattern.search(text_upper)
             if train_match:
                 train_number = train_match.group(1) if train_match.groups() else train_match.group()
                 if train_number and len(train_number) >= 4:
@@ -470,7 +797,7 @@ class OCRService:
         
         # Extract Class - try multiple patterns
         for pattern in self.class_patterns:
-            class_match = pattern.search(text)
+            class_match = pattern.search(text_upper)
             if class_match:
                 class_type = class_match.group(1) if class_match.groups() else class_match.group()
                 # Normalize class type
@@ -481,7 +808,7 @@ class OCRService:
                     break
         
         # Extract Passengers/Seats - try multiple patterns
-        passengers = self._extract_passengers(text)
+        passengers = self._extract_passengers(text_upper)
         result["passengers"] = passengers
         if passengers:
             result["confidence"] += min(len(passengers) * 0.05, 0.3)
@@ -495,6 +822,11 @@ class OCRService:
         """Parse ticket text using OpenAI or Gemini (with automatic fallback)."""
         if not self.ai_service:
             raise AIServiceError("AI service not initialized")
+        
+        cache_key = _ResultCache.key_for(text.encode("utf-8"), self._ai_cache_namespace)
+        cached = _AI_PARSE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
 
         system_prompt = (
             "You are an expert at parsing Indian Railways ticket information. "
@@ -540,6 +872,7 @@ Important:
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.1,
+            max_tokens=AI_PARSE_MAX_TOKENS,
         )
 
         result = {
@@ -557,24 +890,24 @@ Important:
 
         normalized_passengers = []
         for p in result["passengers"]:
-            gender = str(p.get("gender", "M")).upper()
-            if gender not in ["M", "F", "O"]:
-                gender = "M" if gender in ["MALE", "M"] else "F" if gender in ["FEMALE", "F"] else "O"
+            gender = GENDER_CODES.get(str(p.get("gender", "M")).upper(), "O")
 
-            berth = str(p.get("berth_type", "LB")).upper()
-            if berth not in ["LB", "MB", "UB", "SL", "SU"]:
-                berth = "LB"
+            berth = str(p.get("berth_type", DEFAULT_BERTH)).upper()
+            if berth not in _VALID_BERTHS:
+                berth = DEFAULT_BERTH
 
             booking_status = str(p.get("booking_status", "CNF")).upper()
-            if booking_status not in ["CNF", "RAC", "WL", "RLWL", "PQWL"]:
+            if booking_status not in _VALID_BOOKING_STATUSES:
                 booking_status = "CNF"
 
+            age = p.get("age")
+            seat_number = p.get("seat_number")
             normalized_passengers.append({
                 "name": str(p.get("name", "Unknown")).title(),
-                "age": int(p.get("age", 0)) if p.get("age") else 0,
+                "age": int(age) if age else 0,
                 "gender": gender,
                 "coach": str(p.get("coach", "")).upper(),
-                "seat_number": int(p.get("seat_number", 0)) if p.get("seat_number") else 0,
+                "seat_number": int(seat_number) if seat_number else 0,
                 "berth_type": berth,
                 "booking_status": booking_status,
                 "current_status": booking_status,
@@ -586,6 +919,7 @@ Important:
             result["class_type"] = self._normalize_class(result["class_type"])
 
         print(f"✅ AI parsing via {provider} completed with confidence: {result['confidence']:.2f}")
+        _AI_PARSE_CACHE.put(cache_key, result)
         return result
 
     def _normalize_date(self, date_str: str) -> Optional[str]:
@@ -599,18 +933,11 @@ Important:
         # "14 Aug Wednesday 2024" -> "14-Aug-2024"
         
         # Remove day names
-        date_str = re.sub(r'\b(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday)\b', '', date_str, flags=re.IGNORECASE)
+        date_str = _DAYS_RE.sub('', date_str)
         date_str = date_str.strip()
         
-        # Normalize month abbreviations
-        month_map = {
-            'jan': 'Jan', 'feb': 'Feb', 'mar': 'Mar', 'apr': 'Apr',
-            'may': 'May', 'jun': 'Jun', 'jul': 'Jul', 'aug': 'Aug',
-            'sep': 'Sep', 'oct': 'Oct', 'nov': 'Nov', 'dec': 'Dec'
-        }
-        
-        for abbrev, full in month_map.items():
-            date_str = re.sub(rf'\b{abbrev}\b', full, date_str, flags=re.IGNORECASE)
+        # Normalize month abbreviations (single pass over the string)
+        date_str = _MONTH_RE.sub(lambda m: _MONTH_MAP[m.group(0).lower()], date_str)
         
         return date_str if date_str else None
     
@@ -621,7 +948,13 @@ Important:
         
         class_str = class_str.upper().strip()
         
-        # Handle "AC 3 Tier" -> "3A"
+        # Fast path: already a standard code or an exact alias
+        if class_str in _VALID_CLASSES:
+            return class_str
+        if class_str in _CLASS_ALIASES:
+            return _CLASS_ALIASES[class_str]
+        
+        # Handle "AC 3 Tier" -> "3A" embedded in longer text
         if 'AC 3 TIER' in class_str or 'AC3' in class_str:
             return '3A'
         if 'AC 2 TIER' in class_str or 'AC2' in class_str:
@@ -629,10 +962,6 @@ Important:
         if 'AC 1 TIER' in class_str or 'AC1' in class_str:
             return '1A'
         
-        # Standard class codes
-        if class_str in ['1A', '2A', '3A', 'SL', 'CC', 'EC', '2S']:
-            return class_str
-        
         return None
     
     def _extract_stations(self, text: str) -> Dict[str, Optional[str]]:
@@ -641,10 +970,11 @@ Important:
         
         # Try different patterns
         for pattern in self.station_patterns:
-            matches = list(pattern.finditer(text))
+            # Only the first two matches are ever used (boarding, destination), so stop scanning there
+            matches = list(islice(pattern.finditer(text), 2))
             
             # Special handling for "NEW DELHI (NDLS) > KHALILABAD (KLD)" format (4 groups)
-            if matches and len(matches[0].groups()) == 4:
+            if matches and pattern.groups == 4:
                 match = matches[0]
                 boarding_name = match.group(1).strip()
                 boarding_code = match.group(2).upper()
@@ -684,56 +1014,59 @@ Important:
         
         # Try to find "FROM" and "TO" keywords separately
         if not stations["boarding"] or not stations["destination"]:
-            from_match = re.search(r'(?:From|Boarding)\s*:?\s*([A-Z\s]+)\s*\(([A-Z]{2,5})\)', text, re.IGNORECASE)
-            to_match = re.search(r'(?:To|Destination)\s*:?\s*([A-Z\s]+)\s*\(([A-Z]{2,5})\)', text, re.IGNORECASE)
+            from_match = _FROM_KV_RE.search(text)
+            to_match = _TO_KV_RE.search(text)
             
+            # Repair a single-character OCR slip in the code only when the name read
+            # next to it confirms the corrected station
             if from_match:
-                stations["boarding"] = f"{from_match.group(2).upper()} - {from_match.group(1).strip()}"
+                name = from_match.group(1).strip()
+                code = from_match.group(2).upper()
+                code = correct_station_code(code, max_edits=1, name=name) or code
+                stations["boarding"] = f"{code} - {name}"
             if to_match:
-                stations["destination"] = f"{to_match.group(2).upper()} - {to_match.group(1).strip()}"
+                name = to_match.group(1).strip()
+                code = to_match.group(2).upper()
+                code = correct_station_code(code, max_edits=1, name=name) or code
+                stations["destination"] = f"{code} - {name}"
         
         # Fallback: Look for "FROM ... TO" pattern with codes only
         if not stations["boarding"] or not stations["destination"]:
-            from_to_match = re.search(r'([A-Z]{2,5})\s+(?:TO|>|FROM)\s+([A-Z]{2,5})', text, re.IGNORECASE)
+            from_to_match = _FROM_TO_RE.search(text)
             if from_to_match:
-                boarding_code = from_to_match.group(1).upper()
-                dest_code = from_to_match.group(2).upper()
-                stations["boarding"] = boarding_code
-                stations["destination"] = dest_code
+                # Bare codes have no name to confirm a correction against, so keep them as read
+                stations["boarding"] = from_to_match.group(1).upper()
+                stations["destination"] = from_to_match.group(2).upper()
         
         return stations
     
     def _extract_passengers(self, text: str) -> List[Dict[str, Any]]:
-        """Extract passenger details with name, age, gender, coach, seat, and berth information"""
+        """Extract passenger details with name, age, gender, coach, seat, and berth information
+        
+        Expects uppercased text: the passenger and seat patterns are case-sensitive.
+        """
         passengers = []
+        add_passenger = passengers.append
+        seen = set()  # (coach, seat_number) already taken - the first passenger on a seat wins
         
         # First, try to extract complete passenger info (name, age, gender, seat) together
         # This is more reliable as it matches all info for the same passenger
         
         # Pattern 1: "1. Name Age Gender Status/Coach/Seat/Berth"
-        pattern1 = re.compile(
-            r'(?:^\d+\.|#\s*\d+)\s+([A-Z][A-Z\s]{2,30}?)\s+(\d{1,3})\s+(MALE|FEMALE|M|F)\s+(?:CNF|WL|RAC|CAN)\s*[/-]?\s*([A-Z]\d{1,2})\s*[/-]?\s*(\d{1,3})\s*[/-]?\s*(LB|MB|UB|SL|SU)?',
-            re.IGNORECASE | re.MULTILINE
-        )
-        
-        for match in pattern1.finditer(text):
-            name = match.group(1).strip().title()  # Convert to Title Case
-            age = int(match.group(2))
-            gender_str = match.group(3).upper()
-            coach = match.group(4).upper()
-            seat_number = int(match.group(5))
-            berth = (match.group(6).upper() if match.group(6) else "LB")
-            
-            # Normalize gender
-            gender = "M" if gender_str in ["M", "MALE"] else "F" if gender_str in ["F", "FEMALE"] else "O"
+        for match in _PASSENGER_ROW_RE.finditer(text):
+            raw_name, raw_age, raw_gender, raw_coach, raw_seat, raw_berth = match.groups()
+            coach, seat_number = raw_coach.upper(), int(raw_seat)
+            if (coach, seat_number) in seen:
+                continue
+            seen.add((coach, seat_number))
             
-            passengers.append({
-                "name": name,
-                "age": age,
-                "gender": gender,
+            add_passenger({
+                "name": raw_name.strip().title(),  # Convert to Title Case
+                "age": int(raw_age),
+                "gender": GENDER_CODES.get(raw_gender.upper(), "O"),
                 "coach": coach,
                 "seat_number": seat_number,
-                "berth_type": berth,
+                "berth_type": raw_berth.upper() if raw_berth else DEFAULT_BERTH,
                 "booking_status": "CNF",  # Default, can be extracted if available
                 "current_status": "CNF",
             })
@@ -741,18 +1074,10 @@ Important:
         # Pattern 2: Multi-line format "Name\nGender| Age yrs\n...\nStatus/Coach/Seat/Berth"
         # Extract names with gender and age first
         name_age_gender_matches = []
-        pattern2_name = re.compile(
-            r'^([A-Z][A-Z\s]{2,30}?)\s*(?:Male|Female|M|F)\s*\|\s*(\d{1,3})\s*yrs?',
-            re.IGNORECASE | re.MULTILINE
-        )
-        
-        for match in pattern2_name.finditer(text):
+        for match in _PASSENGER_NAME_LINE_RE.finditer(text):
             name = match.group(1).strip().title()
-            age = int(match.group(2))
-            # Find gender from the line
-            gender_match = re.search(r'(?:Male|Female|M|F)', match.group(0), re.IGNORECASE)
-            gender_str = gender_match.group(0).upper() if gender_match else "M"
-            gender = "M" if gender_str in ["M", "MALE"] else "F" if gender_str in ["F", "FEMALE"] else "O"
+            age = int(match.group(3))
+            gender = GENDER_CODES.get(match.group("gender").upper(), "O")
             
             name_age_gender_matches.append({
                 "name": name,
@@ -762,41 +1087,45 @@ Important:
             })
         
         # Now find seat information near each name
+        # (skipped when no names were found - only the name/seat pairing below uses it)
         seat_matches = []
-        for pattern in self.seat_patterns:
-            for match in pattern.finditer(text):
-                if match.groups():
-                    coach = match.group(1).upper()
-                    seat_num = match.group(2)
-                    berth = (match.group(3).upper() if len(match.groups()) > 2 and match.group(3) else "LB")
-                    
-                    if coach and seat_num:
-                        try:
-                            seat_number = int(seat_num)
-                            seat_matches.append({
-                                "coach": coach,
-                                "seat_number": seat_number,
-                                "berth_type": berth,
-                                "position": match.start(),
-                            })
-                        except ValueError:
-                            continue
+        if name_age_gender_matches:
+            for coach, seat_number, berth, position in self._iter_seat_matches(text):
+                seat_matches.append({
+                    "coach": coach,
+                    "seat_number": seat_number,
+                    "berth_type": berth,
+                    "position": position,
+                })
         
         # Match names with seats (closest seat to each name)
         if name_age_gender_matches and seat_matches:
+            # Rank seats by (position, scan order) once; the closest seat to a name is then
+            # one of the two neighbours of its bisect point. Ties keep the earliest-found seat.
+            ranked_seats = sorted((seat["position"], i) for i, seat in enumerate(seat_matches))
+            seat_positions = [position for position, _ in ranked_seats]
+            
             for name_info in name_age_gender_matches:
-                # Find closest seat match
-                closest_seat = None
-                min_distance = float('inf')
+                name_position = name_info["position"]
+                idx = bisect.bisect_left(seat_positions, name_position)
+                
+                candidates = []
+                if idx > 0:
+                    # First seat (in scan order) at the nearest position before the name
+                    candidates.append(ranked_seats[bisect.bisect_left(seat_positions, seat_positions[idx - 1])])
+                if idx < len(ranked_seats):
+                    candidates.append(ranked_seats[idx])
                 
-                for seat_info in seat_matches:
-                    distance = abs(seat_info["position"] - name_info["position"])
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_seat = seat_info
+                seat_position, seat_index = min(
+                    candidates, key=lambda seat: (abs(seat[0] - name_position), seat[1])
+                )
+                closest_seat = seat_matches[seat_index]
+                min_distance = abs(seat_position - name_position)
                 
-                if closest_seat and min_distance < 500:  # Reasonable distance threshold
-                    passengers.append({
+                seat_key = (closest_seat["coach"], closest_seat["seat_number"])
+                if min_distance < 500 and seat_key not in seen:  # Reasonable distance threshold
+                    seen.add(seat_key)
+                    add_passenger({
                         "name": name_info["name"],
                         "age": name_info["age"],
                         "gender": name_info["gender"],
@@ -809,40 +1138,42 @@ Important:
         
         # Fallback: If we couldn't extract names, at least extract seat information
         if not passengers:
-            for pattern in self.seat_patterns:
-                matches = pattern.finditer(text)
-                for match in matches:
-                    if match.groups():
-                        coach = match.group(1).upper()
-                        seat_num = match.group(2)
-                        berth = (match.group(3).upper() if len(match.groups()) > 2 and match.group(3) else "LB")
-                        
-                        if coach and seat_num:
-                            try:
-                                seat_number = int(seat_num)
-                                passengers.append({
-                                    "name": "Unknown",  # Placeholder
-                                    "age": 0,
-                                    "gender": "M",
-                                    "coach": coach,
-                                    "seat_number": seat_number,
-                                    "berth_type": berth,
-                                    "booking_status": "CNF",
-                                    "current_status": "CNF",
-                                })
-                            except ValueError:
-                                continue
+            for coach, seat_number, berth, _ in self._iter_seat_matches(text):
+                if (coach, seat_number) in seen:
+                    continue
+                seen.add((coach, seat_number))
+                add_passenger({
+                    "name": "Unknown",  # Placeholder
+                    "age": 0,
+                    "gender": "M",
+                    "coach": coach,
+                    "seat_number": seat_number,
+                    "berth_type": berth,
+                    "booking_status": "CNF",
+                    "current_status": "CNF",
+                })
         
-        # Remove duplicates based on coach and seat number
-        seen = set()
-        unique_passengers = []
-        for p in passengers:
-            key = (p["coach"], p["seat_number"])
-            if key not in seen:
-                seen.add(key)
-                unique_passengers.append(p)
+        return passengers
+    
+    def _iter_seat_matches(self, text: str):
+        """Yield (coach, seat_number, berth_type, position) for each seat reference
         
-        return unique_passengers
+        Patterns are tried in priority order, each over the whole text, so a reference
+        matched by several patterns is yielded once per pattern (at that pattern's start
+        position). Name pairing relies on those positions, and the seat-only fallback
+        relies on the order: the first reference to a seat wins, i.e. the
+        highest-priority pattern's berth.
+        """
+        for pattern in self.seat_patterns:
+            has_berth = pattern.groups > 2
+            for match in pattern.finditer(text):
+                berth = match.group(3) if has_berth else None
+                yield (
+                    match.group(1).upper(),
+                    int(match.group(2)),
+                    berth.upper() if berth else DEFAULT_BERTH,
+                    match.start(),
+                )
     
     def _get_mock_ticket_text(self) -> str:
         """Return mock ticket text for development/testing"""
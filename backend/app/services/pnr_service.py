@@ -6,7 +6,31 @@ Fetches ticket details using PNR number from Indian Railways APIs
 import httpx
 from typing import Dict, Any, Optional
 from datetime import datetime
-from app.utils.indian_railways import validate_pnr, get_station_name
+from functools import lru_cache
+from app.utils.indian_railways import DEFAULT_BERTH, GENDER_CODES, validate_pnr, get_station_name
+
+# Journey date formats seen in PNR API responses, tried in order
+_DATE_FORMATS = ("%d-%b-%Y", "%Y-%m-%d", "%d-%m-%Y")
+
+
+@lru_cache(maxsize=1024)
+def _parse_journey_date(date_str: str) -> str:
+    """Convert a journey date to ISO (YYYY-MM-DD); unknown formats are returned unchanged"""
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str.strip(), fmt).date().isoformat()
+        except ValueError:
+            pass
+    return date_str
+
+
+def _safe_int(value: Any, default: int = 0) -> int:
+    """int(value), or default when the API sends something unparseable (None, "", "N/A")"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
 
 class PNRService:
     """Service for fetching ticket details using PNR number"""
@@ -15,6 +39,21 @@ class PNRService:
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = 10.0
+        # One pooled client for the service's lifetime so lookups reuse keep-alive
+        # connections instead of paying DNS + TCP + TLS setup every time
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, base_url=self.base_url)
+        return self._client
+    
+    async def close(self):
+        """Close the pooled HTTP client (called on app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def get_ticket_details(self, pnr: str) -> Dict[str, Any]:
         """
@@ -59,12 +98,9 @@ class PNRService:
         if not self.api_key:
             return None
         
-        url = f"{self.base_url}/PNRCheck/apikey/{self.api_key}/PNRNumber/{pnr}"
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                return response.json()
+        response = await self._get_client().get(f"/PNRCheck/apikey/{self.api_key}/PNRNumber/{pnr}")
+        if response.status_code == 200:
+            return response.json()
         return None
     
     async def _fetch_from_alternative_api(self, pnr: str) -> Optional[Dict[str, Any]]:
@@ -109,20 +145,7 @@ class PNRService:
         # Date parsing
         date_str = data.get("JourneyDate") or data.get("journeyDate") or data.get("DateOfJourney")
         if date_str:
-            try:
-                # Try different date formats
-                if isinstance(date_str, str):
-                    # Format: "15-Jan-2025" or "2025-01-15"
-                    if "-" in date_str:
-                        parts = date_str.split("-")
-                        if len(parts) == 3:
-                            if len(parts[2]) == 4:  # YYYY format
-                                result["travel_date"] = date_str
-                            else:  # DD-MMM-YY format
-                                result["travel_date"] = date_str
-                result["travel_date"] = date_str
-            except:
-                pass
+            result["travel_date"] = _parse_journey_date(date_str) if isinstance(date_str, str) else date_str
         
         # Station codes
         boarding_code = data.get("BoardingStationCode") or data.get("from") or data.get("From")
@@ -142,6 +165,7 @@ class PNRService:
         # Passengers
         passengers_data = data.get("PassengerStatus") or data.get("passengers") or data.get("Passengers", [])
         if isinstance(passengers_data, list):
+            add_passenger = result["passengers"].append
             for p in passengers_data:
                 # Extract passenger details with consistent keys
                 name = p.get("Name") or p.get("name") or p.get("PassengerName") or "Unknown"
@@ -153,28 +177,16 @@ class PNRService:
                 booking_status = p.get("BookingStatus") or p.get("bookingStatus") or "CNF"
                 
                 # Normalize gender
-                gender_str = str(gender_str).upper()
-                if gender_str in ["M", "MALE"]:
-                    gender = "M"
-                elif gender_str in ["F", "FEMALE"]:
-                    gender = "F"
-                else:
-                    gender = "O"
-                
-                # Normalize age
-                try:
-                    age = int(age) if age else 0
-                except (ValueError, TypeError):
-                    age = 0
+                gender = GENDER_CODES.get(str(gender_str).upper(), "O")
                 
                 if coach and seat:
-                    result["passengers"].append({
+                    add_passenger({
                         "name": str(name).title(),  # Title case for consistency
-                        "age": age,
+                        "age": _safe_int(age),
                         "gender": gender,
                         "coach": coach.upper(),
-                        "seat_number": int(seat) if isinstance(seat, (int, str)) and str(seat).isdigit() else 0,
-                        "berth_type": berth.upper() if berth else "LB",
+                        "seat_number": _safe_int(seat),
+                        "berth_type": berth.upper() if berth else DEFAULT_BERTH,
                         "booking_status": booking_status,
                         "current_status": booking_status,
                     })
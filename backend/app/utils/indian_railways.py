@@ -2,7 +2,8 @@
 Indian Railways utilities and data
 """
 
-from typing import Dict, List, Optional
+import re
+from typing import Dict, List, Optional, Tuple
 
 # Major station codes
 STATION_CODES: Dict[str, str] = {
@@ -37,6 +38,32 @@ POPULAR_ROUTES = [
     ("HWH", "MAS", ["12839", "12840"]),  # Coromandel Express
 ]
 
+# (source, destination) -> train numbers, built once from POPULAR_ROUTES for hashed lookups
+_ROUTE_INDEX: Dict[Tuple[str, str], List[str]] = {
+    (src, dst): trains for src, dst, trains in POPULAR_ROUTES
+}
+
+# Passenger gender spellings from OCR, AI and PNR sources (anything else is "O")
+GENDER_CODES: Dict[str, str] = {"M": "M", "MALE": "M", "F": "F", "FEMALE": "F"}
+
+# Berth assumed when a source gives none
+DEFAULT_BERTH = "LB"
+
+# Coach letter used for each class (H1, A1, B1, S1, ...)
+_COACH_PREFIXES: Dict[str, str] = {
+    "1A": "H",
+    "2A": "A",
+    "3A": "B",
+    "SL": "S",
+    "CC": "C",
+    "EC": "E",
+    "2S": "D",
+}
+
+# ASCII digits only: str.isdigit() would also accept other Unicode digits such as "²"
+_PNR_RE = re.compile(r'[0-9]{10}')
+_TRAIN_NUMBER_RE = re.compile(r'[0-9]{5}')
+
 # Class configurations
 CLASS_CONFIG = {
     "1A": {
@@ -84,33 +111,92 @@ CLASS_CONFIG = {
 }
 
 
-def get_station_name(code: str) -> Optional[str]:
-    """Get station name from code"""
-    return STATION_CODES.get(code.upper())
+def _deletions(code: str) -> List[str]:
+    """All strings obtained by dropping one character from code"""
+    return [code[:i] + code[i + 1:] for i in range(len(code))]
+
+
+def _build_station_index() -> Dict[str, frozenset]:
+    """Map every station code and each of its single-character deletions to the codes they came from"""
+    index: Dict[str, set] = {}
+    for known in STATION_CODES:
+        for key in [known] + _deletions(known):
+            index.setdefault(key, set()).add(known)
+    return {key: frozenset(codes) for key, codes in index.items()}
+
+
+# Deletion index over STATION_CODES, built once at import. Codes within one edit
+# (insert, delete or substitute) of each other always share a key here.
+_STATION_INDEX = _build_station_index()
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insert, delete or substitution"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            if len(a) == len(b):
+                return a[i + 1:] == b[i + 1:]
+            return a[i:] == b[i + 1:]
+    return True
+
+
+def _name_matches(known_name: str, name: str) -> bool:
+    """True if the first word of a known station name appears among the words of name"""
+    return known_name.split()[0].upper() in name.upper().split()
+
+
+def correct_station_code(code: str, max_edits: int = 0, name: Optional[str] = None) -> Optional[str]:
+    """
+    Return the known station code matching code
+    With max_edits=1, one OCR edit is tolerated, but only when name (the station name
+    read alongside the code) confirms the correction: STATION_CODES is far from
+    complete, so an unconfirmed one-edit match is often a different real station
+    (JU -> JP, ST -> SC). Returns None when nothing matches or the match is ambiguous
+    """
+    code = code.upper()
+    if code in STATION_CODES:
+        return code
+    if max_edits < 1 or not name:
+        return None
+    
+    candidates = set()
+    for key in [code] + _deletions(code):
+        candidates.update(_STATION_INDEX.get(key, ()))
+    # Sharing a deletion key also admits some two-edit pairs (e.g. swapped letters)
+    candidates = [known for known in candidates if _within_one_edit(code, known)]
+    if len(candidates) == 1 and _name_matches(STATION_CODES[candidates[0]], name):
+        return candidates[0]
+    return None
+
+
+def get_station_name(code: str, max_edits: int = 0, name: Optional[str] = None) -> Optional[str]:
+    """Get station name from code (see correct_station_code for max_edits and name)"""
+    corrected = correct_station_code(code, max_edits, name)
+    return STATION_CODES[corrected] if corrected else None
+
+
+def get_popular_trains(src: str, dst: str) -> List[str]:
+    """Get train numbers on a popular route (empty if the route is not listed)"""
+    return _ROUTE_INDEX.get((src.upper(), dst.upper()), [])
 
 
 def validate_pnr(pnr: str) -> bool:
     """Validate PNR format (10 digits)"""
-    return len(pnr) == 10 and pnr.isdigit()
+    return _PNR_RE.fullmatch(pnr) is not None
 
 
 def validate_train_number(train_no: str) -> bool:
     """Validate train number format (5 digits)"""
-    return len(train_no) == 5 and train_no.isdigit()
+    return _TRAIN_NUMBER_RE.fullmatch(train_no) is not None
 
 
 def get_coach_prefix(class_type: str) -> str:
     """Get coach prefix for class type"""
-    prefixes = {
-        "1A": "H",
-        "2A": "A",
-        "3A": "B",
-        "SL": "S",
-        "CC": "C",
-        "EC": "E",
-        "2S": "D",
-    }
-    return prefixes.get(class_type, "S")
+    return _COACH_PREFIXES.get(class_type, "S")
 
 
 def calculate_togetherness_penalty(coaches: List[str], seats: List[int]) -> float:
@@ -121,22 +207,8 @@ def calculate_togetherness_penalty(coaches: List[str], seats: List[int]) -> floa
     if len(coaches) <= 1:
         return 0.0
     
-    penalty = 0.0
-    
-    # Penalty for different coaches
-    unique_coaches = set(coaches)
-    penalty += (len(unique_coaches) - 1) * 30
-    
-    # Penalty for different bays within same coach
-    coach_seats = {}
-    for coach, seat in zip(coaches, seats):
-        if coach not in coach_seats:
-            coach_seats[coach] = []
-        coach_seats[coach].append(seat)
-    
-    for coach, seat_list in coach_seats.items():
-        bays = set((s - 1) // 8 for s in seat_list)
-        penalty += (len(bays) - 1) * 10
-    
-    return penalty
-
+    # 30 per extra coach, plus 10 per extra bay within each coach. Summed over
+    # coaches the bay term is 10 * (distinct (coach, bay) pairs - distinct coaches).
+    coach_count = len(set(coaches))
+    bay_count = len({(coach, (seat - 1) // 8) for coach, seat in zip(coaches, seats)})
+    return float((coach_count - 1) * 30 + (bay_count - coach_count) * 10)
@@ -4,74 +4,175 @@ Creates 3 users with scattered tickets and tests the matching algorithm
 Usage: python test/test_exchange_poc.py
 """
 
-import requests
+import asyncio
+from collections import deque
+from dataclasses import dataclass, fields, is_dataclass
+import httpx
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+import queue
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
 import os
 
+try:
+    import orjson  # Optional: much faster JSON encode/decode
+except Exception:
+    orjson = None
+
+# Shared with the tickets client so every client in a run can use one connection pool
+from test_tickets_async import AsyncTicketsTestClient, make_transport
+
 # Configuration
 BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 API_PREFIX = "/api"
 
+# Users are provisioned concurrently (send-OTP -> verify-OTP -> create-ticket each)
+USER_COUNT = 10
+# POC_VERBOSE=0 drops the per-user/per-ticket/per-match detail (e.g. for throughput runs);
+# section banners, the match count per user and the final summary are still printed
+VERBOSE = os.getenv("POC_VERBOSE", "1") == "1"
+# find-matches requests kept in flight at once during the matching phase
+MATCH_INFLIGHT = 4
+
+
+@dataclass(slots=True)
+class Passenger:
+    """Passenger entry of a ticket payload (orjson serializes slotted dataclasses natively)"""
+    name: str
+    age: int
+    gender: str
+    coach: str
+    seat_number: int
+    berth_type: str
+    booking_status: str = "CNF"
+    current_status: str = "CNF"
+
+
+def _json_default(obj: Any) -> Any:
+    """Stdlib json fallback for dataclasses such as Passenger"""
+    if is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in fields(obj)}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(payload: Any) -> bytes:
+    """Serialize a request body to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_json_default).encode()
+
+
+def _loads(content: bytes) -> Any:
+    """Parse a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Berth for each seat_number % 8 (index 0 = side upper)
+_BERTH_BY_MOD = ("SU", "LB", "MB", "UB", "LB", "MB", "UB", "SL")
+
 
 def berth_from_seat(seat_number: int) -> str:
     """Return berth type based on Indian Railways seat number modulo 8."""
-    mod = seat_number % 8
-    if mod == 1 or mod == 4:
-        return "LB"
-    if mod == 2 or mod == 5:
-        return "MB"
-    if mod == 3 or mod == 6:
-        return "UB"
-    if mod == 7:
-        return "SL"
-    return "SU"
-
-class ExchangePOCClient:
-    """Test client for Exchange POC"""
+    # & 7 == % 8 for the positive seat numbers used here
+    return _BERTH_BY_MOD[seat_number & 7]
+
+class AsyncExchangePOCClient:
+    """Async test client for Exchange POC using httpx"""
     
-    def __init__(self, base_url: str = BASE_URL, api_prefix: str = API_PREFIX):
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        api_prefix: str = API_PREFIX,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
         self.base_url = base_url
         self.api_prefix = api_prefix
         self.users = []
         self.tokens = {}
+        # Authorization header per user, built once at login and reused on every call
+        self.auth_headers: Dict[str, Dict[str, str]] = {}
         self.tickets = {}
-        self.session = requests.Session()
+        # One pooled client for every request; coroutines share its keep-alive connections.
+        # Transport retries cover dropped connections only, so POSTs are never replayed.
+        # With h2 installed, HTTPS servers negotiate HTTP/2 and concurrent requests are
+        # multiplexed over one connection; plain http:// stays on HTTP/1.1 keep-alive
+        # (see make_transport).
+        # Pass a shared transport (see make_transport) to reuse one pool across clients;
+        # it then belongs to the caller and is left open by close().
+        self._owns_transport = transport is None
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=30.0,
+            headers={"Content-Type": "application/json"},
+            transport=transport or make_transport(),
+        )
+        # Console output is queued and written by a daemon thread, so the event loop
+        # never blocks on the stdout lock; everything goes through log() to keep order
+        self._logq: queue.Queue = queue.Queue()
+        threading.Thread(target=self._drain_log, daemon=True).start()
+    
+    def _drain_log(self):
+        """Writer thread: copy queued text to stdout"""
+        while True:
+            text = self._logq.get()
+            sys.stdout.write(text)
+            if self._logq.empty():
+                sys.stdout.flush()
+            self._logq.task_done()
+    
+    def log(self, text: str = "", end: str = "\n"):
+        """Queue text for the writer thread (print-like: appends end)"""
+        self._logq.put(text + end)
+    
+    def flush_log(self):
+        """Block until everything queued so far has been written"""
+        self._logq.join()
+    
+    async def close(self):
+        """Close the HTTP client and drain pending output"""
+        try:
+            if self._owns_transport:
+                await self.client.aclose()
+        finally:
+            self.flush_log()
     
     def _get_headers(self, user_id: str) -> Dict[str, str]:
-        """Get headers with authentication token for a user"""
-        headers = {"Content-Type": "application/json"}
-        if user_id in self.tokens:
-            headers["Authorization"] = f"Bearer {self.tokens[user_id]}"
-        return headers
+        """Get the cached auth header for a user (Content-Type is set on the client)"""
+        return self.auth_headers.get(user_id, {})
+    
+    async def _post_json(self, url: str, payload: Any, user_id: str = None) -> Any:
+        """POST a JSON body (authenticated as user_id, if given) and return the parsed reply"""
+        response = await self.client.post(url, content=_dumps(payload), headers=self.auth_headers.get(user_id))
+        if response.status_code >= 400:
+            response.raise_for_status()
+        return _loads(response.content)
     
-    def create_user_and_authenticate(self, phone: str, name: str) -> Dict[str, Any]:
+    async def create_user_and_authenticate(self, phone: str, name: str) -> Dict[str, Any]:
         """Create a user and authenticate"""
-        print(f"\n{'='*60}")
-        print(f"Creating user: {name} ({phone})")
-        print(f"{'='*60}")
+        if VERBOSE:
+            self.log(f"\n{'='*60}")
+            self.log(f"Creating user: {name} ({phone})")
+            self.log(f"{'='*60}")
         
         # Step 1: Send OTP
-        send_otp_url = f"{self.base_url}{self.api_prefix}/auth/send-otp"
-        response = self.session.post(send_otp_url, json={"phone": phone})
-        response.raise_for_status()
-        otp_data = response.json()
-        print(f"✓ OTP sent (use any 6-digit OTP in DEBUG mode)")
+        send_otp_url = f"{self.api_prefix}/auth/send-otp"
+        otp_data = await self._post_json(send_otp_url, {"phone": phone})
+        if VERBOSE:
+            self.log(f"✓ OTP sent (use any 6-digit OTP in DEBUG mode)")
         
         # Step 2: Verify OTP (use any 6-digit OTP in DEBUG mode)
-        verify_otp_url = f"{self.base_url}{self.api_prefix}/auth/verify-otp"
+        verify_otp_url = f"{self.api_prefix}/auth/verify-otp"
         otp = "123456"  # Any OTP works in DEBUG mode
         
-        response = self.session.post(
-            verify_otp_url,
-            json={"phone": phone, "otp": otp}
-        )
-        response.raise_for_status()
-        token_data = response.json()
+        token_data = await self._post_json(verify_otp_url, {"phone": phone, "otp": otp})
         
         user_id = token_data["user"]["id"]
         self.tokens[user_id] = token_data["access_token"]
+        self.auth_headers[user_id] = {"Authorization": f"Bearer {token_data['access_token']}"}
         self.users.append({
             "id": user_id,
             "phone": phone,
@@ -79,10 +180,11 @@ class ExchangePOCClient:
             "token": token_data["access_token"]
         })
         
-        print(f"✓ User authenticated: {token_data['user']['name']} (ID: {user_id})")
+        if VERBOSE:
+            self.log(f"✓ User authenticated: {token_data['user']['name']} (ID: {user_id})")
         return {"user_id": user_id, "token": token_data["access_token"], "user_data": token_data["user"]}
     
-    def create_ticket(
+    async def create_ticket(
         self,
         user_id: str,
         pnr: str,
@@ -98,8 +200,6 @@ class ExchangePOCClient:
         quota: str = "GN"
     ) -> Dict[str, Any]:
         """Create a ticket for a user"""
-        url = f"{self.base_url}{self.api_prefix}/tickets"
-        
         payload = {
             "pnr": pnr,
             "train_number": train_number,
@@ -114,191 +214,270 @@ class ExchangePOCClient:
             "passengers": passengers
         }
         
-        response = self.session.post(
-            url,
-            json=payload,
-            headers=self._get_headers(user_id)
-        )
-        response.raise_for_status()
-        ticket_data = response.json()
+        return await self.create_ticket_raw(user_id, payload)
+    
+    async def create_ticket_raw(self, user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST one prebuilt ticket payload and record the created ticket"""
+        url = f"{self.api_prefix}/tickets"
+        ticket_data = await self._post_json(url, payload, user_id)
         
-        if user_id not in self.tickets:
-            self.tickets[user_id] = []
-        self.tickets[user_id].append(ticket_data)
+        self.tickets.setdefault(user_id, []).append(ticket_data)
         
         return ticket_data
     
-    def find_matches(self, user_id: str, ticket_id: str) -> List[Dict[str, Any]]:
+    async def find_matches(self, user_id: str, ticket_id: str) -> List[Dict[str, Any]]:
         """Find exchange matches for a ticket"""
-        url = f"{self.base_url}{self.api_prefix}/exchange/find-matches/{ticket_id}"
-        
-        response = self.session.post(
-            url,
-            json={},  # No preferences for now
-            headers=self._get_headers(user_id)
-        )
-        response.raise_for_status()
-        return response.json()
+        url = f"{self.api_prefix}/exchange/find-matches/{ticket_id}"
+        return await self._post_json(url, {}, user_id)  # No preferences for now
     
-    def print_ticket_summary(self, ticket: Dict, user_name: str):
-        """Print a summary of a ticket"""
-        print(f"\n  Ticket: {ticket['pnr']}")
-        print(f"  Train: {ticket['train_number']} - {ticket['train_name']}")
-        print(f"  Route: {ticket['boarding_station']['name']} → {ticket['destination_station']['name']}")
-        print(f"  Date: {ticket['travel_date']}")
-        print(f"  Class: {ticket['class_type']}")
-        print(f"  Passengers ({len(ticket['passengers'])}):")
-        for p in ticket['passengers']:
-            print(f"    - {p['name']}: {p['coach']}/{p['seat_number']}/{p['berth_type']}")
-        print(f"  Scattered: {ticket.get('is_scattered', False)}")
-
-
-def create_scattered_tickets():
+    def format_ticket_summary(self, ticket: Dict, user_name: str) -> str:
+        """Format a summary of a ticket as one string (queued for output as one chunk)"""
+        lines = [
+            f"\n  Ticket: {ticket['pnr']}",
+            f"  Train: {ticket['train_number']} - {ticket['train_name']}",
+            f"  Route: {ticket['boarding_station']['name']} → {ticket['destination_station']['name']}",
+            f"  Date: {ticket['travel_date']}",
+            f"  Class: {ticket['class_type']}",
+            f"  Passengers ({len(ticket['passengers'])}):",
+        ]
+        lines.extend(
+            f"    - {p['name']}: {p['coach']}/{p['seat_number']}/{p['berth_type']}"
+            for p in ticket['passengers']
+        )
+        lines.append(f"  Scattered: {ticket.get('is_scattered', False)}")
+        return "\n".join(lines) + "\n"
+
+
+async def create_scattered_tickets(client: AsyncExchangePOCClient):
     """Create test scenario with scattered seats"""
     
-    # Common travel date (30 days from now)
-    travel_date = datetime.now() + timedelta(days=30)
-    travel_date = travel_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    # Common travel date (30 days from now, UTC midnight). Sent without an offset because
+    # the backend works in naive UTC (datetime.utcnow()) and compares against it
+    travel_date = datetime.now(timezone.utc) + timedelta(days=30)
+    travel_date = travel_date.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    travel_date_iso = travel_date.isoformat()
     
     # All tickets on the same train for matching
     train_number = "12301"
     train_name = "HOWRAH RAJDHANI EXPRESS"
 
-    client = ExchangePOCClient()
+    # Fields shared by every ticket; each user only adds a PNR and passengers
+    base_payload = {
+        "train_number": train_number,
+        "train_name": train_name,
+        "travel_date": travel_date_iso,
+        "boarding_station_code": "NDLS",
+        "boarding_station_name": "NEW DELHI",
+        "destination_station_code": "HWH",
+        "destination_station_name": "HOWRAH JUNCTION",
+        "class_type": "3A",
+        "quota": "GN",
+    }
 
-    print("\n" + "="*60)
-    print("EXCHANGE MATCHING POC - SETUP")
-    print("="*60)
+    client.log("\n" + "="*60)
+    client.log("EXCHANGE MATCHING POC - SETUP")
+    client.log("="*60)
 
-    print(f"\n{'='*60}")
-    print("CREATING 10 USERS WITH SINGLE TICKETS (1-5 PASSENGERS)")
-    print(f"{'='*60}")
+    client.log(f"\n{'='*60}")
+    client.log(f"CREATING {USER_COUNT} USERS WITH SINGLE TICKETS (1-5 PASSENGERS)")
+    client.log(f"{'='*60}")
 
-    users_map = {}
     coaches = ["B1", "B2", "B3", "B4", "B5"]
+    # Seat layout depends only on (i % 9, j), so build every (coach, gender, seat, berth)
+    # row once up front; each user then just slices its first passenger_count rows
+    seat_rows = [
+        [
+            (coaches[j % len(coaches)], "M" if (j % 2 == 0) else "F", 10 * (j + 1) + r, berth_from_seat(10 * (j + 1) + r))
+            for j in range(5)
+        ]
+        for r in range(9)
+    ]
 
-    # Create 10 users, each with 1-5 passengers (tickets)
-    for i in range(10):
+    async def provision(i: int):
+        """Create user i and their ticket (1-5 passengers)"""
         phone = f"98765432{10 + i}"
         name = f"User {i+1}"
-        user = client.create_user_and_authenticate(phone, name)
+        user = await client.create_user_and_authenticate(phone, name)
 
         # Determine number of passengers for this user's ticket (1..5)
         passenger_count = (i % 5) + 1
 
-        passengers = []
-        for j in range(passenger_count):
-            coach = coaches[j % len(coaches)]
-            seat_number = 10 * (j + 1) + (i % 9)
-            berth = berth_from_seat(seat_number)
-            passengers.append({
-                "name": f"Passenger {i+1}-{j+1}",
-                "age": 20 + ((i + j) % 50),
-                "gender": "M" if (j % 2 == 0) else "F",
-                "coach": coach,
-                "seat_number": seat_number,
-                "berth_type": berth,
-                "booking_status": "CNF",
-                "current_status": "CNF",
-            })
+        passengers = [
+            Passenger(f"Passenger {i+1}-{j+1}", 20 + ((i + j) % 50), gender, coach, seat_number, berth)
+            for j, (coach, gender, seat_number, berth) in enumerate(seat_rows[i % 9][:passenger_count])
+        ]
 
         pnr = f"PNR{1000 + i}"
-        ticket = client.create_ticket(
-            user_id=user["user_id"],
-            pnr=pnr,
-            train_number=train_number,
-            train_name=train_name,
-            travel_date=travel_date,
-            boarding_station_code="NDLS",
-            boarding_station_name="NEW DELHI",
-            destination_station_code="HWH",
-            destination_station_name="HOWRAH JUNCTION",
-            class_type="3A",
-            passengers=passengers,
+        ticket = await client.create_ticket_raw(
+            user["user_id"],
+            {**base_payload, "pnr": pnr, "passengers": passengers},
         )
+        return user, ticket
+
+    # Create USER_COUNT users concurrently; gather() returns results in index order,
+    # so the summaries and the returned list stay deterministic
+    results = await asyncio.gather(*(provision(i) for i in range(USER_COUNT)))
+    
+    # One entry per user, in creation order (a list, so no key sorting is needed)
+    users = []
+    for user, ticket in results:
+        if VERBOSE:
+            client.log(client.format_ticket_summary(ticket, user['user_data']['name']), end="")
+        users.append({"user": user, "tickets": [ticket]})
+    
+    return users
+
+
+def format_match_report(idx: int, entry: Dict, matches_result: Dict) -> str:
+    """Format one user's find-matches result (a single line when POC_VERBOSE=0)"""
+    ticket = entry["tickets"][0]
+    total = matches_result.get('total_matches', 0)
+    if not VERBOSE:
+        return f"TEST {idx}: {entry['user']['user_data']['name']} - {total} matches\n"
+
+    out = []
+    add = out.append
+
+    add(f"\n{'='*60}")
+    add(f"TEST {idx}: {entry['user']['user_data']['name']} - Ticket {ticket.get('pnr', ticket.get('id'))}")
+    add(f"{'='*60}")
 
-        client.print_ticket_summary(ticket, user['user_data']['name'])
+    add(f"\n🔍 Searching for exchange matches...")
 
-        users_map[f"user{i+1}"] = {"user": user, "tickets": [ticket]}
+    add(f"\n✓ Found {total} potential matches")
+    matches = matches_result.get("matches", [])
+
+    if matches:
+        add(f"\n📊 Top Matches (up to 5):")
+        for i, match in enumerate(matches[:5], 1):
+            add(f"\n  Match #{i}:")
+            add(f"    User: {match.get('user_name', 'Unknown')} (Rating: {match.get('user_rating', 0)})")
+            add(f"    Match Score: {match.get('match_score', 0)}%")
+            add(f"    Benefit: {match.get('benefit_description', 'N/A')}")
+            add(f"    Available Seats:")
+            for seat in match.get('available_seats', []):
+                add(f"      - {seat.get('passenger_name', 'Unknown')}: {seat.get('coach')}/{seat.get('seat_number')}/{seat.get('berth_type')}")
+    else:
+        add("  ❌ No matches found")
+
+    add("")
+    return "\n".join(out)
+
+
+async def verify_tickets(
+    client: AsyncExchangePOCClient, transport: httpx.AsyncBaseTransport, users_data: List[Dict]
+):
+    """Read every user's tickets back through the tickets client, one per user, all on one transport"""
+    client.log("\n" + "="*60)
+    client.log("VERIFYING CREATED TICKETS")
+    client.log("="*60)
+    
+    readers = []
+    for entry in users_data:
+        reader = AsyncTicketsTestClient(client.base_url, client.api_prefix, transport=transport)
+        reader.token = entry["user"]["token"]
+        readers.append(reader)
+    try:
+        listed = await asyncio.gather(*(reader.get_all_tickets() for reader in readers))
+    finally:
+        await asyncio.gather(*(reader.close() for reader in readers))
     
-    return client, users_map
+    missing = 0
+    for entry, tickets in zip(users_data, listed):
+        listed_ids = {t["id"] for t in tickets}
+        absent = [t["pnr"] for t in entry["tickets"] if t["id"] not in listed_ids]
+        missing += len(absent)
+        if absent:
+            client.log(f"✗ {entry['user']['user_data']['name']}: not listed: {', '.join(absent)}")
+        elif VERBOSE:
+            client.log(f"✓ {entry['user']['user_data']['name']}: {len(tickets)} ticket(s) listed")
+    if not missing:
+        client.log(f"✓ All created tickets are listed for their owners ({len(users_data)} users)")
 
 
-def test_exchange_matching(client: ExchangePOCClient, users_data: Dict):
+async def test_exchange_matching(client: AsyncExchangePOCClient, users_data: List[Dict]):
     """Test the exchange matching algorithm"""
     
-    print("\n" + "="*60)
-    print("TESTING EXCHANGE MATCHING ALGORITHM")
-    print("="*60)
+    client.log("\n" + "="*60)
+    client.log("TESTING EXCHANGE MATCHING ALGORITHM")
+    client.log("="*60)
     
-    print("\n" + "="*60)
-    print("TESTING EXCHANGE MATCHING ALGORITHM FOR ALL USERS")
-    print("="*60)
-
-    for idx, user_key in enumerate(sorted(users_data.keys()), start=1):
-        entry = users_data[user_key]
-        ticket = entry["tickets"][0]
-        user_id = entry["user"]["user_id"]
-
-        print(f"\n{'='*60}")
-        print(f"TEST {idx}: {entry['user']['user_data']['name']} - Ticket {ticket.get('pnr', ticket.get('id'))}")
-        print(f"{'='*60}")
-
-        print(f"\n🔍 Searching for exchange matches...")
-        matches_result = client.find_matches(user_id, ticket["id"])
-
-        total = matches_result.get('total_matches', 0)
-        print(f"\n✓ Found {total} potential matches")
-        matches = matches_result.get("matches", [])
-
-        if matches:
-            print(f"\n📊 Top Matches (up to 5):")
-            for i, match in enumerate(matches[:5], 1):
-                print(f"\n  Match #{i}:")
-                print(f"    User: {match.get('user_name', 'Unknown')} (Rating: {match.get('user_rating', 0)})")
-                print(f"    Match Score: {match.get('match_score', 0)}%")
-                print(f"    Benefit: {match.get('benefit_description', 'N/A')}")
-                print(f"    Available Seats:")
-                for seat in match.get('available_seats', []):
-                    print(f"      - {seat.get('passenger_name', 'Unknown')}: {seat.get('coach')}/{seat.get('seat_number')}/{seat.get('berth_type')}")
-        else:
-            print("  ❌ No matches found")
+    client.log("\n" + "="*60)
+    client.log("TESTING EXCHANGE MATCHING ALGORITHM FOR ALL USERS")
+    client.log("="*60)
+
+    # Pipeline the find-matches calls: at most MATCH_INFLIGHT requests are outstanding,
+    # and each time the oldest finishes the next one is started before its report is
+    # formatted, so output formatting overlaps the following round trips
+    pending = iter(enumerate(users_data, start=1))
+    inflight = deque()
+
+    def submit_next():
+        nxt = next(pending, None)
+        if nxt is not None:
+            idx, entry = nxt
+            task = asyncio.ensure_future(
+                client.find_matches(entry["user"]["user_id"], entry["tickets"][0]["id"])
+            )
+            inflight.append((idx, entry, task))
+
+    for _ in range(MATCH_INFLIGHT):
+        submit_next()
+
+    try:
+        while inflight:
+            idx, entry, task = inflight.popleft()
+            matches_result = await task
+            submit_next()
+            client.log(format_match_report(idx, entry, matches_result), end="")
+    finally:
+        for _, _, task in inflight:
+            task.cancel()
 
     # Summary
-    print(f"\n{'='*60}")
-    print("POC SUMMARY")
-    print(f"{'='*60}")
-    print(f"✓ Created {len(users_data)} users each with one ticket")
-    print(f"✓ Tickets have 1-5 passengers each")
-    sample_ticket = next(iter(users_data.values()))['tickets'][0]
-    print(f"✓ All tickets are on the same train ({sample_ticket['train_number']} - {sample_ticket['train_name']})")
-    print(f"\n💡 Tip: Review match details above to spot good exchange opportunities.")
+    client.log(f"\n{'='*60}")
+    client.log("POC SUMMARY")
+    client.log(f"{'='*60}")
+    client.log(f"✓ Created {len(users_data)} users each with one ticket")
+    client.log(f"✓ Tickets have 1-5 passengers each")
+    sample_ticket = users_data[0]['tickets'][0]
+    client.log(f"✓ All tickets are on the same train ({sample_ticket['train_number']} - {sample_ticket['train_name']})")
+    client.log(f"\n💡 Tip: Review match details above to spot good exchange opportunities.")
 
 
-def main():
+async def main():
     """Main function to run the POC"""
+    # One connection pool for the POC client and the tickets clients used in step 2
+    transport = make_transport()
+    client = AsyncExchangePOCClient(transport=transport)
     try:
         # Step 1: Create users and tickets
-        client, users_data = create_scattered_tickets()
+        users_data = await create_scattered_tickets(client)
+        
+        # Step 2: Read the tickets back through the tickets API client
+        await verify_tickets(client, transport, users_data)
         
-        # Step 2: Test exchange matching
-        test_exchange_matching(client, users_data)
+        # Step 3: Test exchange matching
+        await test_exchange_matching(client, users_data)
         
-        print(f"\n{'='*60}")
-        print("✅ POC COMPLETED SUCCESSFULLY!")
-        print(f"{'='*60}\n")
+        client.log(f"\n{'='*60}")
+        client.log("✅ POC COMPLETED SUCCESSFULLY!")
+        client.log(f"{'='*60}\n")
         
-    except requests.exceptions.HTTPError as e:
-        print(f"\n❌ HTTP Error: {e}")
-        if e.response is not None:
-            print(f"  Status: {e.response.status_code}")
-            print(f"  Response: {e.response.text}")
+    except httpx.HTTPStatusError as e:
+        client.log(f"\n❌ HTTP Error: {e}")
+        client.log(f"  Status: {e.response.status_code}")
+        client.log(f"  Response: {e.response.text}")
     except Exception as e:
-        print(f"\n❌ Error: {e}")
+        client.log(f"\n❌ Error: {e}")
+        client.flush_log()  # keep the traceback (stderr) after the queued output
         import traceback
         traceback.print_exc()
+    finally:
+        await client.close()
+        await transport.aclose()  # the clients leave a shared transport open
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
 
@@ -5,37 +5,123 @@ Usage: python -m pytest test/test_tickets_async.py -v
 """
 
 import asyncio
+import gzip
 import httpx
+import json
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import os
+import sys
 from pathlib import Path
 
+try:
+    import orjson  # Optional: much faster JSON encode/decode
+except Exception:
+    orjson = None
+
+try:
+    import h2  # Optional: enables HTTP/2 in httpx (pip install httpx[http2])
+except Exception:
+    h2 = None
+
 # Configuration
 BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 API_PREFIX = "/api"
+# Image uploads get longer read/write windows than the 30s default, but fail fast on connect
+UPLOAD_TIMEOUT = httpx.Timeout(connect=5.0, read=60.0, write=60.0, pool=5.0)
+# Bodies are sent pre-encoded via content=, so the JSON content type is set explicitly
+_JSON_HEADERS = {"Content-Type": "application/json"}
+# Connection cap of a transport built by make_transport (keep-alive connections included)
+POOL_SIZE = 32
+
+
+def _json_default(obj: Any) -> Any:
+    """Stdlib json fallback for datetimes (orjson serializes them natively)"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(payload: Any) -> bytes:
+    """Serialize a request body to JSON bytes (datetimes become ISO 8601 strings)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_json_default).encode()
+
+
+def _loads(content: bytes) -> Any:
+    """Parse a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+# Bulk bodies larger than this are gzip-compressed (level 1: cheap, and repetitive ticket JSON shrinks a lot)
+GZIP_MIN_BYTES = 1024
+
+
+def _gzip_body(body: bytes) -> Tuple[bytes, Dict[str, str]]:
+    """Gzip a request body if it's big enough to be worth it; returns (body, extra headers)"""
+    if len(body) > GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=1), {"Content-Encoding": "gzip"}
+    return body, {}
+
+
+def make_transport(pool_size: int = POOL_SIZE) -> httpx.AsyncHTTPTransport:
+    """Pooled keep-alive transport; one instance can back several clients (and scripts)"""
+    # HTTP/2 (when h2 is installed and the server offers it over TLS) and limits must be set
+    # here: httpx ignores AsyncClient(http2=..., limits=...) once a transport is passed.
+    # Retries cover failed connection attempts only, so POSTs are never replayed.
+    return httpx.AsyncHTTPTransport(
+        retries=3,
+        http2=h2 is not None,
+        limits=httpx.Limits(
+            max_keepalive_connections=pool_size, max_connections=pool_size, keepalive_expiry=30.0
+        ),
+    )
 
 
 class AsyncTicketsTestClient:
     """Async test client for Tickets API using httpx"""
     
-    def __init__(self, base_url: str = BASE_URL, api_prefix: str = API_PREFIX):
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        api_prefix: str = API_PREFIX,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
         self.base_url = base_url
         self.api_prefix = api_prefix
-        self.token: Optional[str] = None
         self.user_id: Optional[str] = None
-        self.client = httpx.AsyncClient(base_url=base_url, timeout=30.0)
+        # Pass a shared transport (see make_transport) to reuse one pool across clients;
+        # it then belongs to the caller and is left open by close()
+        self._owns_transport = transport is None
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=30.0,
+            transport=transport or make_transport(),
+        )
+        self.token: Optional[str] = None  # after self.client: the setter updates its headers
     
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Close the HTTP client (a shared transport is left to its owner)"""
+        if self._owns_transport:
+            await self.client.aclose()
+    
+    @property
+    def token(self) -> Optional[str]:
+        """Access token; setting it updates the client's default Authorization header"""
+        return self._token
     
-    def _get_headers(self) -> Dict[str, str]:
-        """Get headers with authentication token"""
-        headers = {"Content-Type": "application/json"}
-        if self.token:
-            headers["Authorization"] = f"Bearer {self.token}"
-        return headers
+    @token.setter
+    def token(self, value: Optional[str]):
+        self._token = value
+        # Sent on every request by httpx, so no per-call header dicts are needed.
+        # Content-Type is not a client default: it would override multipart uploads.
+        if value:
+            self.client.headers["Authorization"] = f"Bearer {value}"
+        else:
+            self.client.headers.pop("Authorization", None)
     
     async def authenticate(self, phone: str = "9876543210", use_debug_otp: bool = True) -> Dict[str, Any]:
         """
@@ -52,10 +138,11 @@ class AsyncTicketsTestClient:
         send_otp_url = f"{self.api_prefix}/auth/send-otp"
         response = await self.client.post(
             send_otp_url,
-            json={"phone": phone}
+            content=_dumps({"phone": phone}),
+            headers=_JSON_HEADERS
         )
         response.raise_for_status()
-        otp_data = response.json()
+        otp_data = _loads(response.content)
         
         # Step 2: Verify OTP
         verify_otp_url = f"{self.api_prefix}/auth/verify-otp"
@@ -63,10 +150,11 @@ class AsyncTicketsTestClient:
         
         response = await self.client.post(
             verify_otp_url,
-            json={"phone": phone, "otp": otp}
+            content=_dumps({"phone": phone, "otp": otp}),
+            headers=_JSON_HEADERS
         )
         response.raise_for_status()
-        token_data = response.json()
+        token_data = _loads(response.content)
         
         self.token = token_data["access_token"]
         self.user_id = token_data["user"]["id"]
@@ -91,15 +179,14 @@ class AsyncTicketsTestClient:
         """
         url = f"{self.api_prefix}/tickets/upload"
         
+        # httpx streams file fields in 64 KiB chunks from the open handle, so the
+        # image is never held in memory as a whole
         with open(image_path, "rb") as f:
             files = {"file": (os.path.basename(image_path), f, content_type)}
-            headers = {}
-            if self.token:
-                headers["Authorization"] = f"Bearer {self.token}"
-            
-            response = await self.client.post(url, files=files, headers=headers)
+            # Authorization comes from the client defaults; httpx sets the multipart Content-Type
+            response = await self.client.post(url, files=files, timeout=UPLOAD_TIMEOUT)
             response.raise_for_status()
-            return response.json()
+            return _loads(response.content)
     
     async def create_ticket(
         self,
@@ -140,7 +227,7 @@ class AsyncTicketsTestClient:
             "pnr": pnr,
             "train_number": train_number,
             "train_name": train_name,
-            "travel_date": travel_date.isoformat(),
+            "travel_date": travel_date,  # serialized by _dumps
             "boarding_station_code": boarding_station_code,
             "boarding_station_name": boarding_station_name,
             "destination_station_code": destination_station_code,
@@ -152,44 +239,56 @@ class AsyncTicketsTestClient:
         
         response = await self.client.post(
             url,
-            json=payload,
-            headers=self._get_headers()
+            content=_dumps(payload),
+            headers=_JSON_HEADERS
+        )
+        response.raise_for_status()
+        return _loads(response.content)
+    
+    async def create_tickets_bulk(self, payloads: list) -> list:
+        """
+        Create several tickets in one POST /tickets/bulk round trip
+        
+        Args:
+            payloads: Ticket dictionaries with the same fields as create_ticket
+        
+        Returns:
+            Created tickets, in request order
+        """
+        url = f"{self.api_prefix}/tickets/bulk"
+        body, extra_headers = _gzip_body(_dumps({"tickets": payloads}))
+        
+        response = await self.client.post(
+            url,
+            content=body,
+            headers={**_JSON_HEADERS, **extra_headers}
         )
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     async def get_all_tickets(self) -> list:
         """Get all tickets for current user"""
         url = f"{self.api_prefix}/tickets"
         
-        response = await self.client.get(
-            url,
-            headers=self._get_headers()
-        )
+        response = await self.client.get(url)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     async def get_ticket(self, ticket_id: str) -> Dict[str, Any]:
         """Get ticket by ID"""
         url = f"{self.api_prefix}/tickets/{ticket_id}"
         
-        response = await self.client.get(
-            url,
-            headers=self._get_headers()
-        )
+        response = await self.client.get(url)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
     
     async def delete_ticket(self, ticket_id: str) -> Dict[str, Any]:
         """Delete a ticket"""
         url = f"{self.api_prefix}/tickets/{ticket_id}"
         
-        response = await self.client.delete(
-            url,
-            headers=self._get_headers()
-        )
+        response = await self.client.delete(url)
         response.raise_for_status()
-        return response.json()
+        return _loads(response.content)
 
 
 def create_sample_ticket_data() -> Dict[str, Any]:
@@ -222,67 +321,100 @@ def create_sample_ticket_data() -> Dict[str, Any]:
 
 async def run_async_tests():
     """Run all ticket endpoint tests asynchronously"""
-    print("=" * 60)
-    print("Tickets API Async Test Client")
-    print("=" * 60)
-    print()
+    # Each test block's output is collected and written with one stdout call
+    out = []
+    add = out.append
+    
+    def flush():
+        if out:
+            sys.stdout.write("\n".join(out) + "\n")
+            out.clear()
+    
+    add("=" * 60)
+    add("Tickets API Async Test Client")
+    add("=" * 60)
+    add("")
+    flush()
     
     client = AsyncTicketsTestClient()
     
     try:
         # Test 1: Authentication
-        print("Test 1: Authentication")
-        print("-" * 60)
+        add("Test 1: Authentication")
+        add("-" * 60)
+        flush()
         auth_data = await client.authenticate()
-        print()
+        add("")
+        flush()
         
         # Test 2: Create Ticket (2S class)
-        print("Test 2: Create Ticket (2S class - JANSHATABDI)")
-        print("-" * 60)
+        add("Test 2: Create Ticket (2S class - JANSHATABDI)")
+        add("-" * 60)
         ticket_data_2s = create_sample_ticket_data()
         created_ticket_2s = await client.create_ticket(**ticket_data_2s)
-        print(f"✓ Created ticket: {created_ticket_2s['pnr']}")
-        print(f"  Train: {created_ticket_2s['train_name']}")
-        print(f"  From: {created_ticket_2s['boarding_station']['name']} → {created_ticket_2s['destination_station']['name']}")
-        print(f"  Passengers: {len(created_ticket_2s['passengers'])}")
-        print(f"  Is Scattered: {created_ticket_2s['is_scattered']}")
+        add(f"✓ Created ticket: {created_ticket_2s['pnr']}")
+        add(f"  Train: {created_ticket_2s['train_name']}")
+        add(f"  From: {created_ticket_2s['boarding_station']['name']} → {created_ticket_2s['destination_station']['name']}")
+        add(f"  Passengers: {len(created_ticket_2s['passengers'])}")
+        add(f"  Is Scattered: {created_ticket_2s['is_scattered']}")
         ticket_id_2s = created_ticket_2s['id']
-        print()
+        add("")
+        flush()
         
         # Test 3: Get All Tickets
-        print("Test 3: Get All Tickets")
-        print("-" * 60)
+        add("Test 3: Get All Tickets")
+        add("-" * 60)
         all_tickets = await client.get_all_tickets()
-        print(f"✓ Retrieved {len(all_tickets)} tickets")
+        add(f"✓ Retrieved {len(all_tickets)} tickets")
         for ticket in all_tickets:
-            print(f"  - {ticket['pnr']}: {ticket['train_name']} ({ticket['class_type']})")
-        print()
+            add(f"  - {ticket['pnr']}: {ticket['train_name']} ({ticket['class_type']})")
+        add("")
+        flush()
         
         # Test 4: Get Ticket by ID
-        print("Test 4: Get Ticket by ID")
-        print("-" * 60)
+        add("Test 4: Get Ticket by ID")
+        add("-" * 60)
         ticket = await client.get_ticket(ticket_id_2s)
-        print(f"✓ Retrieved ticket: {ticket['pnr']}")
-        print(f"  Train: {ticket['train_name']}")
-        print()
+        add(f"✓ Retrieved ticket: {ticket['pnr']}")
+        add(f"  Train: {ticket['train_name']}")
+        add("")
+        flush()
         
         # Test 5: Delete Ticket
-        print("Test 5: Delete Ticket")
-        print("-" * 60)
+        add("Test 5: Delete Ticket")
+        add("-" * 60)
         delete_result = await client.delete_ticket(ticket_id_2s)
-        print(f"✓ {delete_result['message']}")
-        print()
+        add(f"✓ {delete_result['message']}")
+        add("")
+        flush()
+        
+        # Test 6: Bulk Create (one request for several tickets), then clean up
+        add("Test 6: Bulk Create Tickets")
+        add("-" * 60)
+        # Build the shared ticket fields once; each bulk entry only overrides the PNR
+        bulk_base = create_sample_ticket_data()
+        bulk_payloads = [{**bulk_base, "pnr": pnr} for pnr in ("6635006116", "6635006117")]
+        created = await client.create_tickets_bulk(bulk_payloads)
+        add(f"✓ Created {len(created)} tickets in one request: {', '.join(t['pnr'] for t in created)}")
+        # Independent deletes: run them together (multiplexed when HTTP/2 is available)
+        await asyncio.gather(*(client.delete_ticket(t['id']) for t in created))
+        add(f"✓ Deleted bulk-created tickets")
+        add("")
+        flush()
         
-        print("=" * 60)
-        print("All async tests completed!")
-        print("=" * 60)
+        add("=" * 60)
+        add("All async tests completed!")
+        add("=" * 60)
+        flush()
         
     except httpx.HTTPStatusError as e:
+        flush()  # show the partial block before the error
         print(f"✗ HTTP Error: {e}")
         if e.response is not None:
             print(f"  Status: {e.response.status_code}")
             print(f"  Response: {e.response.text}")
     except Exception as e:
+        flush()
         print(f"✗ Error: {e}")
         import traceback
         traceback.print_exc()
@@ -1,70 +1,270 @@
 """
 Test client for Tickets API endpoints
 Usage: python test/test_tickets_client.py
+
+requests (and the http.client/urllib3 tweaks) are imported when the first
+TicketsTestClient is created, so --help and importing the sample-data helpers
+don't pay for them.
 """
 
-import requests
+import argparse
+import base64
+import gzip
 import json
+import mmap
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import os
 from pathlib import Path
 
+try:
+    import orjson  # Optional: much faster JSON encode/decode
+except Exception:
+    orjson = None
+
 # Configuration
 BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 API_PREFIX = "/api"
 
+# Applied to every request: endpoints answer directly (a redirect means a wrong URL or
+# proxy, so surface it instead of following), and a dead server fails in seconds
+SESSION_DEFAULTS = {"allow_redirects": False, "timeout": (3.05, 30)}
+# OCR can run well past 30s server-side, so uploads get a longer read timeout
+UPLOAD_DEFAULTS = {**SESSION_DEFAULTS, "timeout": (3.05, 120)}
+# Server-side cap on tickets per POST /tickets/bulk (MAX_BULK_TICKETS in the API)
+BULK_BATCH_SIZE = 50
+# Bulk bodies larger than this are gzip-compressed (level 1: cheap, and repetitive ticket JSON shrinks a lot)
+GZIP_MIN_BYTES = 1024
+# JSON bodies are sent pre-encoded via data=, so the content type is set explicitly
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Request bodies (e.g. streamed image uploads) are sent in blocksize chunks: 8 KiB in
+# http.client, 16 KiB in urllib3 2.x. 64 KiB cuts the send() calls for multi-MB images.
+SEND_BLOCKSIZE = 64 * 1024
+# Tokens from earlier runs, keyed by API URL + phone, so reruns can skip send/verify-OTP
+TOKEN_CACHE_PATH = Path(os.getenv(
+    "TICKETS_TEST_TOKEN_CACHE",
+    Path.home() / ".cache" / "tickets_test_client" / "token.json",
+))
+# A cached token must stay valid at least this long (seconds) to be reused
+TOKEN_EXPIRY_MARGIN = 60
+# Worker cap for the *_concurrently helpers (each worker thread gets its own Session)
+MAX_WORKERS = 10
+# Sample ticket image for the upload test, resolved once at import
+_HERE = Path(__file__).resolve().parent
+_DEFAULT_IMAGE = _HERE / "ticket2.jpeg"
+_DEFAULT_IMAGE_STR = os.fspath(_DEFAULT_IMAGE)
+_blocksize_patched = False
+
+
+def _raise_send_blocksize(size: int = SEND_BLOCKSIZE):
+    """Raise the default connection send block size (applied once per process)"""
+    global _blocksize_patched
+    if _blocksize_patched:
+        return
+    import http.client
+    import urllib3.connection
+    # urllib3 1.x relies on http.client's positional default
+    init = http.client.HTTPConnection.__init__
+    init.__defaults__ = tuple(size if x == 8192 else x for x in init.__defaults__)
+    # urllib3 2.x passes its own keyword-only default down to http.client
+    kwdefaults = getattr(urllib3.connection.HTTPConnection.__init__, "__kwdefaults__", None)
+    if kwdefaults and "blocksize" in kwdefaults:
+        kwdefaults["blocksize"] = size
+    _blocksize_patched = True
+
+
+
+def _json_default(obj: Any) -> Any:
+    """Stdlib json fallback for datetimes (orjson serializes them natively)"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(payload: Any) -> bytes:
+    """Serialize a request body to JSON bytes (datetimes become ISO 8601 strings)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_json_default).encode()
+
+
+def _loads(content: bytes) -> Any:
+    """Parse a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _parse(response) -> Any:
+    """Parse a JSON response body; 3xx/4xx/5xx responses raise HTTPError"""
+    if response.status_code >= 400:
+        response.raise_for_status()
+    if response.status_code >= 300:
+        # Redirects aren't followed (SESSION_DEFAULTS), and their bodies aren't JSON
+        from requests.exceptions import HTTPError
+        raise HTTPError(
+            f"{response.status_code} Redirect to {response.headers.get('Location')} for url: {response.url}",
+            response=response,
+        )
+    return _loads(response.content)
+
+
+def _gzip_body(body: bytes) -> Tuple[bytes, Dict[str, str]]:
+    """Gzip a request body if it's big enough to be worth it; returns (body, extra headers)"""
+    if len(body) > GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=1), {"Content-Encoding": "gzip"}
+    return body, {}
+
+
+def _jwt_exp(token: str) -> Optional[float]:
+    """Read the exp claim from a JWT without verifying it (None if absent or malformed)"""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except Exception:
+        return None
+
+
+def _load_token_cache() -> Dict[str, Any]:
+    """Read the on-disk token cache (empty if missing or unreadable)"""
+    try:
+        with open(TOKEN_CACHE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_token_cache(cache: Dict[str, Any]):
+    """Write the token cache atomically, readable only by the current user"""
+    TOKEN_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = TOKEN_CACHE_PATH.with_name(TOKEN_CACHE_PATH.name + ".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, TOKEN_CACHE_PATH)
+
 class TicketsTestClient:
     """Test client for Tickets API"""
     
     def __init__(self, base_url: str = BASE_URL, api_prefix: str = API_PREFIX):
         self.base_url = base_url
         self.api_prefix = api_prefix
-        self.token: Optional[str] = None
         self.user_id: Optional[str] = None
-        self.session = requests.Session()
+        # Imported here rather than at module level to keep the script's startup cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+        try:
+            # Optional: streams multipart uploads from the file handle (pip install requests-toolbelt)
+            from requests_toolbelt import MultipartEncoder
+        except Exception:
+            MultipartEncoder = None
+        _raise_send_blocksize()
+        self._requests = requests
+        self._http_adapter = HTTPAdapter
+        self._multipart_encoder = MultipartEncoder
+        # requests.Session is not thread-safe, so the *_concurrently helpers' worker
+        # threads each get their own; all of them share this one headers dict
+        self._local = threading.local()
+        self._headers = requests.utils.default_headers()
+        self.token = None
+    
+    @property
+    def session(self):
+        """The calling thread's requests.Session (created on first use)"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._requests.Session()
+            session.headers = self._headers
+            # Larger keep-alive pool than requests' default of 10 connections per host
+            adapter = self._http_adapter(pool_connections=32, pool_maxsize=32)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return session
     
-    def _get_headers(self) -> Dict[str, str]:
-        """Get headers with authentication token"""
-        headers = {"Content-Type": "application/json"}
-        if self.token:
-            headers["Authorization"] = f"Bearer {self.token}"
-        return headers
+    @property
+    def token(self) -> Optional[str]:
+        """Access token; setting it updates the session's default Authorization header"""
+        return self._token
     
-    def authenticate(self, phone: str = "9876543210", use_debug_otp: bool = True) -> Dict[str, Any]:
+    @token.setter
+    def token(self, value: Optional[str]):
+        self._token = value
+        # Merged into every request by the sessions, so no per-call header dicts are needed.
+        # Content-Type is not a session default: it would override multipart uploads.
+        if value:
+            self._headers["Authorization"] = f"Bearer {value}"
+        else:
+            self._headers.pop("Authorization", None)
+    
+    def authenticate(
+        self,
+        phone: str = "9876543210",
+        use_debug_otp: bool = True,
+        force_login: bool = False
+    ) -> Dict[str, Any]:
         """
         Authenticate and get access token
         
+        A token cached by an earlier run for the same API and phone is reused while it
+        has more than TOKEN_EXPIRY_MARGIN seconds left.
+        
         Args:
             phone: Phone number (10 digits)
             use_debug_otp: If True, use "123456" as OTP (works in DEBUG mode)
+            force_login: If True, ignore the token cache and run the OTP flow
         
         Returns:
             Authentication response with token
         """
+        cache_key = f"{self.base_url}|{phone}"
+        cache = _load_token_cache()
+        cached = cache.get(cache_key)
+        if not force_login and cached and (cached.get("exp") or 0) > time.time() + TOKEN_EXPIRY_MARGIN:
+            self.token = cached["access_token"]
+            self.user_id = cached["user"]["id"]
+            print(f"✓ Reusing cached token for user: {cached['user']['name']} (ID: {self.user_id})")
+            return cached
+        
         # Step 1: Send OTP
         send_otp_url = f"{self.base_url}{self.api_prefix}/auth/send-otp"
-        response = requests.post(
+        response = self.session.post(
             send_otp_url,
-            json={"phone": phone}
+            data=_dumps({"phone": phone}),
+            headers=_JSON_HEADERS,
+            **SESSION_DEFAULTS
         )
-        response.raise_for_status()
-        otp_data = response.json()
+        otp_data = _parse(response)
         
         # Step 2: Verify OTP
         verify_otp_url = f"{self.base_url}{self.api_prefix}/auth/verify-otp"
         otp = "123456" if use_debug_otp else otp_data.get("debug_otp", "123456")
         
-        response = requests.post(
+        response = self.session.post(
             verify_otp_url,
-            json={"phone": phone, "otp": otp}
+            data=_dumps({"phone": phone, "otp": otp}),
+            headers=_JSON_HEADERS,
+            **SESSION_DEFAULTS
         )
-        response.raise_for_status()
-        token_data = response.json()
+        token_data = _parse(response)
         
         self.token = token_data["access_token"]
         self.user_id = token_data["user"]["id"]
         
+        exp = _jwt_exp(self.token)
+        if exp is not None:
+            cache[cache_key] = {"access_token": self.token, "user": token_data["user"], "exp": exp}
+            try:
+                _save_token_cache(cache)
+            except OSError as e:
+                print(f"⚠ Could not write token cache: {e}")
+        
         print(f"✓ Authenticated as user: {token_data['user']['name']} (ID: {self.user_id})")
         return token_data
     
@@ -86,14 +286,55 @@ class TicketsTestClient:
         url = f"{self.base_url}{self.api_prefix}/tickets/upload"
         
         with open(image_path, "rb") as f:
-            files = {"file": (os.path.basename(image_path), f, content_type)}
+            fields = {"file": (os.path.basename(image_path), f, content_type)}
             headers = {}
-            if self.token:
-                headers["Authorization"] = f"Bearer {self.token}"
             
-            response = self.session.post(url, files=files, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            if self._multipart_encoder is not None:
+                # Read and sent in chunks; files= would build the whole body in memory first
+                encoder = self._multipart_encoder(fields=fields)
+                headers["Content-Type"] = encoder.content_type
+                response = self.session.post(url, data=encoder, headers=headers, **UPLOAD_DEFAULTS)
+            else:
+                response = self.session.post(url, files=fields, headers=headers, **UPLOAD_DEFAULTS)
+            return _parse(response)
+    
+    def upload_ticket_image_raw(
+        self,
+        image_path: str,
+        content_type: str = "image/jpeg"
+    ) -> Dict[str, Any]:
+        """
+        Upload ticket image for OCR processing as a raw (non-multipart) body
+        
+        The file is memory-mapped and sent as-is, so no Python-side copies of it are
+        made. Falls back to upload_ticket_image() if the server has no /upload-raw.
+        
+        Args:
+            image_path: Path to image file
+            content_type: MIME type of the file
+        
+        Returns:
+            OCR extraction results
+        """
+        url = f"{self.base_url}{self.api_prefix}/tickets/upload-raw"
+        
+        with open(image_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap can't map an empty file; let the multipart path report it
+                return self.upload_ticket_image(image_path, content_type)
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                headers = {
+                    "Content-Type": content_type,
+                    "Content-Length": str(len(mm))
+                }
+                response = self.session.post(url, data=mm, headers=headers, **UPLOAD_DEFAULTS)
+            finally:
+                mm.close()
+        if response.status_code in (404, 405):
+            # Older server without the raw endpoint
+            return self.upload_ticket_image(image_path, content_type)
+        return _parse(response)
     
     def create_ticket(
         self,
@@ -134,7 +375,7 @@ class TicketsTestClient:
             "pnr": pnr,
             "train_number": train_number,
             "train_name": train_name,
-            "travel_date": travel_date.isoformat(),
+            "travel_date": travel_date,  # serialized by _dumps
             "boarding_station_code": boarding_station_code,
             "boarding_station_name": boarding_station_name,
             "destination_station_code": destination_station_code,
@@ -146,11 +387,11 @@ class TicketsTestClient:
         
         response = self.session.post(
             url,
-            json=payload,
-            headers=self._get_headers()
+            data=_dumps(payload),
+            headers=_JSON_HEADERS,
+            **SESSION_DEFAULTS
         )
-        response.raise_for_status()
-        return response.json()
+        return _parse(response)
     
     def get_all_tickets(self) -> list:
         """Get all tickets for current user"""
@@ -158,10 +399,9 @@ class TicketsTestClient:
         
         response = self.session.get(
             url,
-            headers=self._get_headers()
+            **SESSION_DEFAULTS
         )
-        response.raise_for_status()
-        return response.json()
+        return _parse(response)
     
     def get_ticket(self, ticket_id: str) -> Dict[str, Any]:
         """Get ticket by ID"""
@@ -169,10 +409,9 @@ class TicketsTestClient:
         
         response = self.session.get(
             url,
-            headers=self._get_headers()
+            **SESSION_DEFAULTS
         )
-        response.raise_for_status()
-        return response.json()
+        return _parse(response)
     
     def delete_ticket(self, ticket_id: str) -> Dict[str, Any]:
         """Delete a ticket"""
@@ -180,10 +419,73 @@ class TicketsTestClient:
         
         response = self.session.delete(
             url,
-            headers=self._get_headers()
+            **SESSION_DEFAULTS
         )
-        response.raise_for_status()
-        return response.json()
+        return _parse(response)
+    
+    def create_ticket_raw(self, body: bytes) -> Dict[str, Any]:
+        """Create a ticket from an already JSON-encoded payload (e.g. sample_2s_ticket_body())"""
+        url = f"{self.base_url}{self.api_prefix}/tickets"
+        
+        response = self.session.post(
+            url,
+            data=body,
+            headers=_JSON_HEADERS,
+            **SESSION_DEFAULTS
+        )
+        return _parse(response)
+    
+    def create_tickets_batch(self, tickets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create several tickets via POST /tickets/bulk, one request per BULK_BATCH_SIZE tickets
+        
+        Args:
+            tickets: Ticket dictionaries (kwargs as for create_ticket)
+        
+        Returns:
+            Created tickets, in input order
+        """
+        url = f"{self.base_url}{self.api_prefix}/tickets/bulk"
+        created = []
+        for start in range(0, len(tickets), BULK_BATCH_SIZE):
+            body, extra_headers = _gzip_body(_dumps({"tickets": tickets[start:start + BULK_BATCH_SIZE]}))
+            response = self.session.post(
+                url,
+                data=body,
+                headers={**_JSON_HEADERS, **extra_headers},
+                **SESSION_DEFAULTS
+            )
+            created.extend(_parse(response))
+        return created
+    
+    def create_tickets_concurrently(self, tickets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create several tickets in parallel threads (kwargs as for create_ticket; results in input order)
+        
+        All or nothing: if any create fails, the tickets that were created are deleted
+        and the first error is re-raised, so no ticket is left behind on the server.
+        """
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(tickets) or 1)) as pool:
+            futures = [pool.submit(self.create_ticket, **ticket_data) for ticket_data in tickets]
+            # Leaving the with block waits for every create, failed or not
+        
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            for future in futures:
+                if future.exception() is None:
+                    self.delete_ticket(future.result()['id'])
+            raise errors[0]
+        return [future.result() for future in futures]
+    
+    def get_tickets_concurrently(self, ticket_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch several tickets by ID in parallel threads (results in input order)"""
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(ticket_ids) or 1)) as pool:
+            return list(pool.map(self.get_ticket, ticket_ids))
+    
+    def upload_ticket_images_concurrently(self, image_paths: List[str]) -> List[Dict[str, Any]]:
+        """Upload several ticket images in parallel threads (results in input order)"""
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(image_paths) or 1)) as pool:
+            return list(pool.map(self.upload_ticket_image, image_paths))
 
 
 def create_sample_ticket_data() -> Dict[str, Any]:
@@ -264,7 +566,32 @@ def create_sample_3a_ticket_data() -> Dict[str, Any]:
     }
 
 
-def run_tests():
+# The 3A sample travels 30 days from now, so its encoded body keeps a placeholder for the date
+_TRAVEL_DATE_PLACEHOLDER = b"__TRAVEL_DATE__"
+
+
+@lru_cache(maxsize=None)
+def sample_2s_ticket_body() -> bytes:
+    """Encoded 2S sample ticket for create_ticket_raw (encoded on first use, then reused)"""
+    return _dumps(create_sample_ticket_data())
+
+
+@lru_cache(maxsize=None)
+def _sample_3a_body_template() -> bytes:
+    """Encoded 3A sample ticket with a placeholder travel date"""
+    return _dumps({
+        **create_sample_3a_ticket_data(),
+        "travel_date": _TRAVEL_DATE_PLACEHOLDER.decode(),
+    })
+
+
+def sample_3a_ticket_body() -> bytes:
+    """Encoded 3A sample ticket for create_ticket_raw, with the current travel date filled in"""
+    travel_date = datetime.now() + timedelta(days=30)
+    return _sample_3a_body_template().replace(_TRAVEL_DATE_PLACEHOLDER, travel_date.isoformat().encode())
+
+
+def run_tests(force_login: bool = False):
     """Run all ticket endpoint tests"""
     print("=" * 60)
     print("Tickets API Test Client")
@@ -272,14 +599,19 @@ def run_tests():
     print()
     
     client = TicketsTestClient()
+    requests = client._requests
     
     try:
         # Test 1: Authentication
         print("Test 1: Authentication")
         print("-" * 60)
-        auth_data = client.authenticate()
+        auth_data = client.authenticate(force_login=force_login)
         print()
         
+        # Tests 2 and 3 are independent; to create both in one request instead:
+        #     created_ticket_2s, created_ticket_3a = client.create_tickets_batch(
+        #         [create_sample_ticket_data(), create_sample_3a_ticket_data()])
+        
         # # Test 2: Create Ticket (2S class)
         # print("Test 2: Create Ticket (2S class - JANSHATABDI)")
         # print("-" * 60)
@@ -329,11 +661,10 @@ def run_tests():
         # Test 6: Upload Ticket Image (if image exists)
         print("Test 6: Upload Ticket Image")
         print("-" * 60)
-        test_image_path = Path(__file__).parent / "ticket2.jpeg"
-        print('#image path:', test_image_path)
-        if test_image_path.exists():
+        print('#image path:', _DEFAULT_IMAGE_STR)
+        if _DEFAULT_IMAGE.exists():
             try:
-                upload_result = client.upload_ticket_image(str(test_image_path))
+                upload_result = client.upload_ticket_image(_DEFAULT_IMAGE_STR)
                 print(f"✓ Uploaded and processed ticket image")
                 print(f"  Confidence: {upload_result.get('confidence', 0):.2%}")
                 print('data in the image:', upload_result)
@@ -346,7 +677,7 @@ def run_tests():
             except Exception as e:
                 print(f"✗ Upload failed: {e}")
         else:
-            print(f"⚠ Test image not found at {test_image_path}")
+            print(f"⚠ Test image not found at {_DEFAULT_IMAGE_STR}")
             print("  Skipping upload test")
         print()
         
@@ -370,6 +701,35 @@ def run_tests():
         #         print(f"✗ Unexpected error: {e}")
         # print()
         
+        # Test 9: Create, fetch and delete the sample tickets from worker threads
+        print("Test 9: Concurrent Create / Get / Delete")
+        print("-" * 60)
+        created = client.create_tickets_concurrently(
+            [create_sample_ticket_data(), create_sample_3a_ticket_data()])
+        try:
+            print(f"✓ Created {len(created)} tickets: {', '.join(t['pnr'] for t in created)}")
+            fetched = client.get_tickets_concurrently([t['id'] for t in created])
+            print(f"✓ Fetched {len(fetched)} tickets: {', '.join(t['pnr'] for t in fetched)}")
+        finally:
+            for t in created:
+                client.delete_ticket(t['id'])
+            print(f"✓ Deleted {len(created)} tickets")
+        print()
+        
+        # Test 10: Create tickets from pre-encoded sample bodies
+        print("Test 10: Create Tickets from Encoded Bodies")
+        print("-" * 60)
+        created = []
+        try:
+            for body in (sample_2s_ticket_body(), sample_3a_ticket_body()):
+                created.append(client.create_ticket_raw(body))
+            print(f"✓ Created {len(created)} tickets: {', '.join(t['pnr'] for t in created)}")
+        finally:
+            for t in created:
+                client.delete_ticket(t['id'])
+            print(f"✓ Deleted {len(created)} tickets")
+        print()
+        
         # print("=" * 60)
         # print("All tests completed!")
         # print("=" * 60)
@@ -386,5 +746,8 @@ def run_tests():
 
 
 if __name__ == "__main__":
-    run_tests()
+    parser = argparse.ArgumentParser(description="Tickets API test client")
+    parser.add_argument("--force-login", action="store_true", help="ignore the cached token and run the OTP flow")
+    args = parser.parse_args()
+    run_tests(force_login=args.force_login)
 